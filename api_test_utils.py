@@ -0,0 +1,21 @@
+"""
+Shared helpers for the standalone backend test scripts
+"""
+import re
+from collections import namedtuple
+import requests
+
+# Devanagari block, used to check that Hindi answers are actually in Hindi
+HINDI_RE = re.compile(r'[\u0900-\u097F]')
+# Fields every trusted source entry must carry
+SOURCE_FIELDS = frozenset(("title", "url", "description"))
+# Fields every /api/chat/query response must carry
+CHAT_REQUIRED = frozenset(("session_id", "answer", "sources", "timestamp"))
+# One row of a tester's test_results; status is PASSED, FAILED or SKIPPED
+ResultRow = namedtuple("ResultRow", "test status details")
+
+def json_session():
+    """Keep-alive session for every request of a run, so the TLS handshake happens once"""
+    session = requests.Session()
+    session.headers.update({"Content-Type": "application/json"})
+    return session
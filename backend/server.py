@@ -1,20 +1,29 @@
-from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi import FastAPI, APIRouter, BackgroundTasks, Header, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from starlette.middleware.gzip import GZipMiddleware
+from pymongo import AsyncMongoClient
 import os
 import logging
+import logging.handlers
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
 import uuid
-from datetime import datetime, timezone
-import google.generativeai as genai
+from datetime import datetime, timedelta, timezone
 import httpx
-import pandas as pd
-import io
 import asyncio
-import json
+import functools
+import hashlib
+import itertools
+import queue
+import re
+import time
+import orjson
+import weakref
+import ahocorasick
+from cachetools import TTLCache
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -24,23 +33,55 @@ logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
+# QueueHandler formats each record in the calling thread and enqueues it; only the stderr write happens on the listener thread
+_root_logger = logging.getLogger()
+LOG_LISTENER = logging.handlers.QueueListener(
+    queue.SimpleQueue(), *_root_logger.handlers, respect_handler_level=True
+)
+_root_logger.handlers = [logging.handlers.QueueHandler(LOG_LISTENER.queue)]
+LOG_LISTENER.start()
 logger = logging.getLogger(__name__)
 
-# Configure Gemini API
+# Gemini API (the SDK is heavy, so it is imported and configured on first use)
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY', '')
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-    logger.info("Gemini API configured successfully")
-else:
+GEMINI_MODEL_NAME = 'gemini-2.0-flash-exp'
+if not GEMINI_API_KEY:
     logger.warning("No Gemini API key found in environment")
+# Bound on in-flight Gemini requests per worker, so bursts queue here instead of tripping 429s
+GEMINI_CONCURRENCY = int(os.environ.get('GEMINI_CONCURRENCY', '8'))
+_GEMINI_SEM = asyncio.Semaphore(GEMINI_CONCURRENCY)
+
+@functools.lru_cache(maxsize=None)
+def get_genai():
+    """Import and configure the Gemini SDK once"""
+    import google.generativeai as genai
+    if GEMINI_API_KEY:
+        genai.configure(api_key=GEMINI_API_KEY)
+        logger.info("Gemini API configured successfully")
+    return genai
+
+@functools.lru_cache(maxsize=None)
+def get_gemini_model():
+    """Shared Gemini model handle, built on first use instead of per service instance"""
+    return get_genai().GenerativeModel(GEMINI_MODEL_NAME)
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# tz_aware so BSON Dates come back as UTC datetimes (serialized with their +00:00 offset);
+# a few pooled connections stay warm and wire traffic is zlib-compressed (no extra dependency)
+client = AsyncMongoClient(
+    mongo_url,
+    tz_aware=True,
+    maxPoolSize=int(os.environ.get('MONGO_MAX_POOL_SIZE', '50')),
+    minPoolSize=int(os.environ.get('MONGO_MIN_POOL_SIZE', '5')),
+    serverSelectionTimeoutMS=3000,
+    compressors="zlib",
+    appname="agri-climate"
+)
 db = client[os.environ['DB_NAME']]
 
-# Create the main app without a prefix
-app = FastAPI()
+# Create the main app without a prefix; responses are encoded with orjson
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -78,6 +119,35 @@ class DatasetInfo(BaseModel):
 # Data.gov.in API Configuration
 DATA_GOV_API = "https://api.data.gov.in/resource"
 DATA_GOV_KEY = "579b464db66ec23bdd000001cdd3946e44ce4aad7209ff7b23ac571b"  # Public demo key
+# Records requested per dataset; only this many are ever passed on to answer generation
+RECORDS_PER_DATASET = 20
+# Fewer fetched records than this counts as partial data and triggers a hybrid answer
+PARTIAL_DATA_THRESHOLD = 5
+# Upper bound on the serialized size of a single record included in an LLM prompt
+MAX_RECORD_CHARS = 500
+# Longer string values inside a prompt record are cut to this many characters
+MAX_FIELD_CHARS = 64
+# Upper bound on the combined size of all sample record lines in one prompt
+MAX_PROMPT_RECORDS_CHARS = 8000
+
+# Shared HTTP client so connections to data.gov.in are kept alive and reused across requests
+HTTP_CLIENT = httpx.AsyncClient(
+    timeout=30.0,
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    # Compressed JSON bodies; httpx decodes br via the Brotli package
+    headers={"Accept-Encoding": "gzip, br"}
+)
+
+# Bound on concurrent outbound calls to data.gov.in per worker, to stay under its rate limits
+DATA_GOV_CONCURRENCY = int(os.environ.get('DATA_GOV_CONCURRENCY', '8'))
+_DATA_GOV_SEM = asyncio.Semaphore(DATA_GOV_CONCURRENCY)
+
+# Cache for data.gov.in records; the upstream data changes at most daily
+DATA_GOV_CACHE_TTL = int(os.environ.get('DATA_GOV_CACHE_TTL', '3600'))
+_FETCH_CACHE = TTLCache(maxsize=512, ttl=DATA_GOV_CACHE_TTL)
+# Per-key locks so concurrent misses for the same dataset collapse into one upstream call
+_FETCH_LOCKS = weakref.WeakValueDictionary()
 
 # Agriculture & Climate Datasets from data.gov.in
 KNOWN_DATASETS = [
@@ -89,6 +159,89 @@ KNOWN_DATASETS = [
     }
 ]
 
+# Columns requested per dataset (data.gov.in `fields` projection); datasets not listed return all columns
+DATASET_FIELDS = {
+    "9ef84268-d588-465a-a308-a864a43d0070": (
+        "state", "district", "market", "commodity", "variety",
+        "arrival_date", "min_price", "max_price", "modal_price"
+    ),
+}
+
+# Comprehensive keywords map covering agricultural topics (query keyword -> related dataset terms)
+KEYWORDS_MAP = {
+    # Price-related keywords
+    "price": ("price", "commodity", "mandi", "market"),
+    "cost": ("price", "commodity", "mandi", "market"),
+    "rate": ("price", "commodity", "mandi", "market"),
+    "mandi": ("price", "commodity", "mandi", "market"),
+    "market": ("price", "commodity", "mandi", "market"),
+    "commodity": ("price", "commodity", "mandi", "market"),
+    # Crop-related keywords
+    "crop": ("production", "yield", "commodity", "price"),
+    "agriculture": ("production", "yield", "farming", "commodity", "price"),
+    "farming": ("production", "yield", "commodity", "price"),
+    "production": ("production", "yield", "commodity"),
+    # Specific crops (common vegetables and grains)
+    "rice": ("commodity", "price", "production"),
+    "wheat": ("commodity", "price", "production"),
+    "potato": ("commodity", "price", "production"),
+    "onion": ("commodity", "price", "production"),
+    "tomato": ("commodity", "price", "production"),
+    "vegetable": ("commodity", "price", "production"),
+    "grain": ("commodity", "price", "production"),
+    "fruit": ("commodity", "price", "production"),
+    # Hindi equivalents
+    "मूल्य": ("price", "commodity", "mandi", "market"),  # price
+    "कीमत": ("price", "commodity", "mandi", "market"),  # price/cost
+    "मंडी": ("price", "commodity", "mandi", "market"),  # mandi
+    "फसल": ("production", "yield", "commodity", "price"),  # crop
+    "कृषि": ("production", "yield", "commodity", "price"),  # agriculture
+    "चावल": ("commodity", "price", "production"),  # rice
+    "गेहूं": ("commodity", "price", "production"),  # wheat
+    "आलू": ("commodity", "price", "production"),  # potato
+    "प्याज": ("commodity", "price", "production"),  # onion
+    "टमाटर": ("commodity", "price", "production"),  # tomato
+    "सब्जी": ("commodity", "price", "production"),  # vegetable
+}
+
+# Clearly non-agricultural terms that should trigger the AI fallback when no dataset matches
+NON_AGRICULTURAL_TERMS = (
+    'weather', 'forecast', 'climate', 'quantum', 'physics', 'computing', 'technology',
+    'artificial intelligence', 'machine learning', 'software', 'programming',
+    'mathematics', 'chemistry', 'biology', 'history', 'geography', 'politics',
+    'entertainment', 'sports', 'music', 'movies', 'books', 'literature',
+    # Hindi terms
+    'मौसम', 'भविष्यवाणी', 'जलवायु', 'क्वांटम', 'भौतिकी', 'कंप्यूटिंग', 'तकनीक',
+    'कृत्रिम बुद्धिमत्ता', 'मशीन लर्निंग', 'सॉफ्टवेयर', 'प्रोग्रामिंग',
+    'गणित', 'रसायन', 'जीवविज्ञान', 'इतिहास', 'भूगोल', 'राजनीति'
+)
+_NON_AGRICULTURAL_RE = re.compile("|".join(re.escape(term) for term in NON_AGRICULTURAL_TERMS))
+# Devanagari terms can never match an ASCII query, so English queries use a smaller pattern
+_NON_AGRICULTURAL_ASCII_RE = re.compile(
+    "|".join(re.escape(term) for term in NON_AGRICULTURAL_TERMS if term.isascii())
+)
+
+# Catalog size above which search_datasets runs in a worker thread
+SEARCH_THREAD_THRESHOLD = 50
+
+# Single Aho-Corasick automaton so one pass over the query finds every keyword it contains
+_KEYWORD_AUTOMATON = ahocorasick.Automaton()
+for _keyword in KEYWORDS_MAP:
+    _KEYWORD_AUTOMATON.add_word(_keyword, _keyword)
+_KEYWORD_AUTOMATON.make_automaton()
+
+# Per-dataset index built once at import for search_datasets:
+# (dataset, lowercased text, keywords whose related terms appear in that text)
+_DATASET_INDEX = []
+for _dataset in KNOWN_DATASETS:
+    _text = f"{_dataset['title'].lower()} {_dataset['description'].lower()}"
+    _keywords = frozenset(
+        keyword for keyword, related in KEYWORDS_MAP.items()
+        if any(r in _text for r in related)
+    )
+    _DATASET_INDEX.append((_dataset, _text, _keywords))
+_DATASET_INDEX = tuple(_DATASET_INDEX)
+
 # Trusted reference sources for fallback responses
 TRUSTED_SOURCES = {
     "agriculture": [
@@ -158,11 +311,65 @@ TRUSTED_SOURCES = {
     ]
 }
 
+# Query keywords that route to each trusted-source bucket (in priority order)
+SOURCE_TOPIC_KEYWORDS = {
+    "prices": ('price', 'cost', 'rate', 'mandi', 'market', 'मूल्य', 'कीमत', 'मंडी'),
+    "crops": ('crop', 'production', 'yield', 'farming', 'फसल', 'उत्पादन'),
+    "climate": ('weather', 'climate', 'rainfall', 'monsoon', 'मौसम', 'जलवायु', 'बारिश'),
+    "agriculture": ('agriculture', 'agricultural', 'farming', 'कृषि'),
+}
+
+# Keyword -> topics automaton so get_relevant_sources scans the question once
+_SOURCE_TOPIC_AUTOMATON = ahocorasick.Automaton()
+for _topic, _words in SOURCE_TOPIC_KEYWORDS.items():
+    for _word in _words:
+        _SOURCE_TOPIC_AUTOMATON.add_word(_word, _SOURCE_TOPIC_AUTOMATON.get(_word, ()) + (_topic,))
+_SOURCE_TOPIC_AUTOMATON.make_automaton()
+
+def _merge_sources(topics) -> tuple:
+    """Deduplicated (by URL) top 5 trusted sources for a set of matched topics, general sources last"""
+    merged = {}
+    for topic in (*(t for t in SOURCE_TOPIC_KEYWORDS if t in topics), "general"):
+        for source in TRUSTED_SOURCES[topic]:
+            merged.setdefault(source["url"], source)
+    return tuple(merged.values())[:5]
+
+# Source lists for every combination of matched topics, so lookups need no per-request dedup
+_SOURCES_BY_TOPICS = {
+    frozenset(combo): _merge_sources(combo)
+    for size in range(len(SOURCE_TOPIC_KEYWORDS) + 1)
+    for combo in itertools.combinations(SOURCE_TOPIC_KEYWORDS, size)
+}
+
 class DataService:
     """Service to fetch and process data from data.gov.in"""
     
     @staticmethod
-    async def fetch_dataset(resource_id: str, filters: Dict = None, limit: int = 100, max_retries: int = 3) -> List[Dict]:
+    async def fetch_dataset(resource_id: str, filters: Dict = None, limit: int = 100, max_retries: int = 3,
+                            fields: Optional[List[str]] = None) -> List[Dict]:
+        """Fetch data from data.gov.in API, serving repeated requests from the TTL cache"""
+        # Filter order doesn't change the upstream result, so normalise it for the cache key
+        key = (resource_id, tuple(sorted(filters.items())) if filters else None, limit, tuple(fields or ()))
+        if key in _FETCH_CACHE:
+            return _FETCH_CACHE[key]
+        
+        lock = _FETCH_LOCKS.get(key)
+        if lock is None:
+            lock = asyncio.Lock()
+            _FETCH_LOCKS[key] = lock
+        
+        async with lock:
+            # Another request may have populated the cache while we waited
+            if key in _FETCH_CACHE:
+                return _FETCH_CACHE[key]
+            records = await DataService._fetch_from_api(resource_id, filters, limit, max_retries, fields)
+            if records:  # Don't cache failures so the next request retries upstream
+                _FETCH_CACHE[key] = records
+            return records
+    
+    @staticmethod
+    async def _fetch_from_api(resource_id: str, filters: Dict = None, limit: int = 100, max_retries: int = 3,
+                              fields: Optional[List[str]] = None) -> List[Dict]:
         """Fetch data from data.gov.in API with retry mechanism"""
         retry_delays = [1, 2, 4]  # Exponential backoff: 1s, 2s, 4s
         
@@ -175,93 +382,67 @@ class DataService:
                 }
                 if filters:
                     params["filters"] = filters
+                if fields:
+                    # Server-side projection keeps unused columns off the wire
+                    params["fields"] = ",".join(fields)
                     
-                async with httpx.AsyncClient(timeout=30.0) as client:
-                    response = await client.get(
+                async with _DATA_GOV_SEM:
+                    response = await HTTP_CLIENT.get(
                         f"{DATA_GOV_API}/{resource_id}",
                         params=params
                     )
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        records = data.get("records", [])
-                        if attempt > 0:
-                            logger.info(f"✅ Successfully fetched data on retry attempt {attempt + 1}")
-                        return records
-                    else:
-                        logger.warning(f"API error on attempt {attempt + 1}: {response.status_code}")
-                        if attempt < max_retries - 1:
-                            await asyncio.sleep(retry_delays[attempt])
+                
+                if response.status_code == 200:
+                    data = orjson.loads(response.content)
+                    records = data.get("records", [])
+                    if attempt > 0:
+                        logger.info("✅ Successfully fetched data on retry attempt %d", attempt + 1)
+                    return records
+                else:
+                    logger.warning("API error on attempt %d: %s", attempt + 1, response.status_code)
+                    # Only rate limiting and server errors are worth retrying
+                    if response.status_code != 429 and response.status_code < 500:
+                        break
+                    if attempt < max_retries - 1:
+                        await asyncio.sleep(retry_delays[attempt])
                         
             except Exception as e:
-                logger.error(f"Error fetching dataset (attempt {attempt + 1}/{max_retries}): {str(e)}")
+                logger.error("Error fetching dataset (attempt %d/%d): %s", attempt + 1, max_retries, e)
                 if attempt < max_retries - 1:
-                    logger.info(f"Retrying in {retry_delays[attempt]} seconds...")
+                    logger.info("Retrying in %s seconds...", retry_delays[attempt])
                     await asyncio.sleep(retry_delays[attempt])
         
-        logger.error(f"Failed to fetch data after {max_retries} attempts")
+        logger.error("Failed to fetch dataset %s from data.gov.in", resource_id)
         return []
     
     @staticmethod
     async def search_datasets(query: str) -> List[Dict[str, str]]:
         """Search for relevant datasets based on query with broad matching"""
+        # Scoring is pure CPU work; keep it off the event loop once the catalog is large enough to matter
+        if len(KNOWN_DATASETS) >= SEARCH_THREAD_THRESHOLD:
+            return await asyncio.to_thread(DataService._search_datasets_sync, query)
+        return DataService._search_datasets_sync(query)
+    
+    @staticmethod
+    def _search_datasets_sync(query: str) -> List[Dict[str, str]]:
+        """Score KNOWN_DATASETS against the query (blocking)"""
         query_lower = query.lower()
         relevant = []
         
-        # Comprehensive keywords map covering agricultural topics
-        keywords_map = {
-            # Price-related keywords
-            "price": ["price", "commodity", "mandi", "market"],
-            "cost": ["price", "commodity", "mandi", "market"],
-            "rate": ["price", "commodity", "mandi", "market"],
-            "mandi": ["price", "commodity", "mandi", "market"],
-            "market": ["price", "commodity", "mandi", "market"],
-            "commodity": ["price", "commodity", "mandi", "market"],
-            # Crop-related keywords
-            "crop": ["production", "yield", "commodity", "price"],
-            "agriculture": ["production", "yield", "farming", "commodity", "price"],
-            "farming": ["production", "yield", "commodity", "price"],
-            "production": ["production", "yield", "commodity"],
-            # Specific crops (common vegetables and grains)
-            "rice": ["commodity", "price", "production"],
-            "wheat": ["commodity", "price", "production"],
-            "potato": ["commodity", "price", "production"],
-            "onion": ["commodity", "price", "production"],
-            "tomato": ["commodity", "price", "production"],
-            "vegetable": ["commodity", "price", "production"],
-            "grain": ["commodity", "price", "production"],
-            "fruit": ["commodity", "price", "production"],
-            # Hindi equivalents
-            "मूल्य": ["price", "commodity", "mandi", "market"],  # price
-            "कीमत": ["price", "commodity", "mandi", "market"],  # price/cost
-            "मंडी": ["price", "commodity", "mandi", "market"],  # mandi
-            "फसल": ["production", "yield", "commodity", "price"],  # crop
-            "कृषि": ["production", "yield", "commodity", "price"],  # agriculture
-            "चावल": ["commodity", "price", "production"],  # rice
-            "गेहूं": ["commodity", "price", "production"],  # wheat
-            "आलू": ["commodity", "price", "production"],  # potato
-            "प्याज": ["commodity", "price", "production"],  # onion
-            "टमाटर": ["commodity", "price", "production"],  # tomato
-            "सब्जी": ["commodity", "price", "production"],  # vegetable
-        }
+        # Only words longer than 3 characters count towards direct text matches
+        query_words = [word for word in query_lower.split() if len(word) > 3]
+        # Keywords present in the query don't depend on the dataset, so resolve them once
+        query_keywords = {keyword for _, keyword in _KEYWORD_AUTOMATON.iter(query_lower)}
         
         # Search logic with scoring
-        for dataset in KNOWN_DATASETS:
+        for dataset, dataset_text, dataset_keywords in _DATASET_INDEX:
             score = 0
-            dataset_text = f"{dataset['title'].lower()} {dataset['description'].lower()}"
             
             # Check keyword matches
-            for keyword, related in keywords_map.items():
-                if keyword in query_lower:
-                    if any(r in dataset_text for r in related):
-                        score += 2
+            score += 2 * len(query_keywords & dataset_keywords)
             
             # Check if any word from query is in dataset title or description
-            query_words = query_lower.split()
-            for word in query_words:
-                if len(word) > 3:  # Only consider words longer than 3 characters
-                    if word in dataset_text:
-                        score += 1
+            score += sum(1 for word in query_words if word in dataset_text)
             
             if score > 0:
                 relevant.append(dataset)
@@ -269,26 +450,15 @@ class DataService:
         # If no datasets matched, check if query is completely outside agricultural domain
         # For non-agricultural queries, return empty to trigger AI fallback
         if not relevant:
-            # Define clearly non-agricultural terms that should trigger fallback
-            non_agricultural_terms = [
-                'weather', 'forecast', 'climate', 'quantum', 'physics', 'computing', 'technology',
-                'artificial intelligence', 'machine learning', 'software', 'programming',
-                'mathematics', 'chemistry', 'biology', 'history', 'geography', 'politics',
-                'entertainment', 'sports', 'music', 'movies', 'books', 'literature',
-                # Hindi terms
-                'मौसम', 'भविष्यवाणी', 'जलवायु', 'क्वांटम', 'भौतिकी', 'कंप्यूटिंग', 'तकनीक',
-                'कृत्रिम बुद्धिमत्ता', 'मशीन लर्निंग', 'सॉफ्टवेयर', 'प्रोग्रामिंग',
-                'गणित', 'रसायन', 'जीवविज्ञान', 'इतिहास', 'भूगोल', 'राजनीति'
-            ]
-            
             # Check if query contains clearly non-agricultural terms
-            is_non_agricultural = any(term in query_lower for term in non_agricultural_terms)
+            pattern = _NON_AGRICULTURAL_ASCII_RE if query_lower.isascii() else _NON_AGRICULTURAL_RE
+            is_non_agricultural = pattern.search(query_lower) is not None
             
             if is_non_agricultural:
-                logger.info(f"Query '{query}' identified as non-agricultural. Triggering AI fallback.")
+                logger.info("Query '%s' identified as non-agricultural. Triggering AI fallback.", query)
                 return []  # Return empty to trigger AI fallback
             else:
-                logger.info(f"No specific match for query '{query}', using all datasets as fallback")
+                logger.info("No specific match for query '%s', using all datasets as fallback", query)
                 relevant = KNOWN_DATASETS.copy()
         
         return relevant[:3]  # Return top 3 relevant datasets
@@ -296,77 +466,65 @@ class DataService:
 class QueryProcessor:
     """Process natural language queries using Gemini"""
     
-    def __init__(self):
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-    
-    async def extract_query_intent(self, question: str, language: str) -> Dict[str, Any]:
-        """Extract structured intent from natural language question"""
-        system_prompt = """You are a query analyzer for agricultural and climate data. 
+    SYSTEM_PROMPT = """You are a query analyzer for agricultural and climate data. 
 Extract key information from user questions:
 - Main topic (agriculture, climate, rainfall, crops, etc.)
 - Location/State mentioned
 - Time period
 - Specific metrics requested
-- Query type (comparison, trend, statistics, top-N)
-
-Respond in JSON format with: {"topic": "...", "location": "...", "time_period": "...", "metrics": [...], "query_type": "..."}"""
-        
-        prompt = f"{system_prompt}\n\nAnalyze this {language} question: {question}"
+- Query type (comparison, trend, statistics, top-N)"""
+    
+    # Gemini is constrained to reply with exactly this JSON shape
+    INTENT_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "topic": {"type": "string"},
+            "location": {"type": "string", "nullable": True},
+            "time_period": {"type": "string", "nullable": True},
+            "metrics": {"type": "array", "items": {"type": "string"}},
+            "query_type": {"type": "string"}
+        },
+        "required": ["topic", "query_type"]
+    }
+    
+    @functools.cached_property
+    def model(self):
+        # Built once with the static system prompt; each call only sends the question
+        return get_genai().GenerativeModel(
+            GEMINI_MODEL_NAME,
+            system_instruction=self.SYSTEM_PROMPT,
+            generation_config={
+                "response_mime_type": "application/json",
+                "response_schema": self.INTENT_SCHEMA,
+                "temperature": 0
+            }
+        )
+    
+    async def extract_query_intent(self, question: str, language: str) -> Dict[str, Any]:
+        """Extract structured intent from natural language question"""
+        prompt = f"Analyze this {language} question: {question}"
         
         try:
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                prompt
-            )
-            intent = json.loads(response.text)
-            return intent
+            async with _GEMINI_SEM:
+                response = await self.model.generate_content_async(prompt)
+            text = response.text
         except Exception as e:
-            logger.error(f"Error extracting query intent: {str(e)}")
+            logger.error("Error extracting query intent: %s", e)
             return {"topic": question, "query_type": "general"}
-
-class AnswerGenerator:
-    """Generate answers with source citations"""
-    
-    def __init__(self):
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
-    
-    @staticmethod
-    def get_relevant_sources(question: str) -> List[Dict[str, str]]:
-        """Get relevant trusted sources based on query topic"""
-        question_lower = question.lower()
-        relevant_sources = []
-        
-        # Determine query topic and add relevant sources
-        if any(word in question_lower for word in ['price', 'cost', 'rate', 'mandi', 'market', 'मूल्य', 'कीमत', 'मंडी']):
-            relevant_sources.extend(TRUSTED_SOURCES['prices'])
-        
-        if any(word in question_lower for word in ['crop', 'production', 'yield', 'farming', 'फसल', 'उत्पादन']):
-            relevant_sources.extend(TRUSTED_SOURCES['crops'])
-        
-        if any(word in question_lower for word in ['weather', 'climate', 'rainfall', 'monsoon', 'मौसम', 'जलवायु', 'बारिश']):
-            relevant_sources.extend(TRUSTED_SOURCES['climate'])
-        
-        if any(word in question_lower for word in ['agriculture', 'agricultural', 'farming', 'कृषि']):
-            relevant_sources.extend(TRUSTED_SOURCES['agriculture'])
-        
-        # Always add general sources
-        relevant_sources.extend(TRUSTED_SOURCES['general'])
-        
-        # Remove duplicates while preserving order
-        seen = set()
-        unique_sources = []
-        for source in relevant_sources:
-            if source['url'] not in seen:
-                seen.add(source['url'])
-                unique_sources.append(source)
-        
-        return unique_sources[:5]  # Return top 5 most relevant sources
-    
-    async def generate_answer(self, question: str, data_context: List[Dict], records_data: List[Dict], language: str) -> str:
-        """Generate natural language answer from live data only"""
-        lang_instruction = "Answer in Hindi (हिंदी में उत्तर दें)" if language == "hi" else "Answer in English"
         
-        system_prompt = f"""You are an agricultural and climate data expert for India. 
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError as e:
+            logger.error("Error parsing query intent: %s", e)
+            return {"topic": question, "query_type": "general"}
+
+# Answer-language instruction embedded in every answer prompt
+LANG_INSTRUCTIONS = {
+    "en": "Answer in English",
+    "hi": "Answer in Hindi (हिंदी में उत्तर दें)"
+}
+
+ANSWER_PROMPT_TEMPLATE = """You are an agricultural and climate data expert for India. 
 Analyze and answer questions based ONLY on the live data provided from data.gov.in.
 {lang_instruction}.
 
@@ -377,39 +535,8 @@ Guidelines:
 - Provide actionable insights for policymakers based on the data
 - Keep answers concise but comprehensive
 - If the data doesn't fully answer the question, clearly state what information is missing"""
-        
-        # Format data context with actual records
-        context_text = "Live data from data.gov.in:\n\n"
-        for idx, item in enumerate(data_context, 1):
-            context_text += f"{idx}. {item}\n"
-        
-        # Add sample records for detailed analysis
-        if records_data:
-            context_text += "\nSample data records for analysis:\n"
-            for idx, record in enumerate(records_data[:10], 1):  # Include up to 10 records
-                context_text += f"\nRecord {idx}: {record}\n"
-        
-        prompt = f"{system_prompt}\n\nQuestion: {question}\n\n{context_text}"
-        
-        try:
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                prompt
-            )
-            return response.text
-        except Exception as e:
-            logger.error(f"Error generating answer: {str(e)}")
-            return f"Unable to generate answer due to error: {str(e)}"
-    
-    async def generate_hybrid_answer(self, question: str, partial_data: List[Dict], partial_records: List[Dict], language: str) -> tuple:
-        """Generate hybrid answer combining partial live data with AI knowledge"""
-        lang_instruction = "Answer in Hindi (हिंदी में उत्तर दें)" if language == "hi" else "Answer in English"
-        
-        disclaimer_en = "ℹ️ Hybrid Response: Combining available live data with general knowledge for a comprehensive answer.\n\n"
-        disclaimer_hi = "ℹ️ हाइब्रिड प्रतिक्रिया: व्यापक उत्तर के लिए उपलब्ध लाइव डेटा को सामान्य ज्ञान के साथ जोड़ना।\n\n"
-        disclaimer = disclaimer_hi if language == "hi" else disclaimer_en
-        
-        system_prompt = f"""You are an agricultural and climate expert for India. 
+
+HYBRID_PROMPT_TEMPLATE = """You are an agricultural and climate expert for India. 
 You have PARTIAL live data from data.gov.in, but not complete information to fully answer the question.
 
 Your task:
@@ -425,43 +552,8 @@ Guidelines:
 - Include typical price ranges, production patterns, or climate information
 - Offer actionable tips for farmers or policymakers
 - Keep the answer comprehensive but well-structured"""
-        
-        # Format partial data context
-        context_text = "Partial live data available from data.gov.in:\n\n"
-        for idx, item in enumerate(partial_data, 1):
-            context_text += f"{idx}. {item}\n"
-        
-        if partial_records:
-            context_text += "\nSample records from available data:\n"
-            for idx, record in enumerate(partial_records[:5], 1):
-                context_text += f"\nRecord {idx}: {record}\n"
-        
-        prompt = f"{system_prompt}\n\nQuestion: {question}\n\n{context_text}"
-        
-        # Get relevant trusted sources (do this first, before AI call)
-        trusted_sources = self.get_relevant_sources(question)
-        
-        try:
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                prompt
-            )
-            return disclaimer + response.text, trusted_sources
-        except Exception as e:
-            logger.error(f"Error generating hybrid answer: {str(e)}")
-            error_msg = "क्षमा करें, उत्तर उत्पन्न करने में त्रुटि।" if language == "hi" else "Error generating answer."
-            # Still return trusted sources even if AI generation fails
-            return disclaimer + error_msg, trusted_sources
-    
-    async def generate_fallback_answer(self, question: str, language: str, reason: str = "data_unavailable") -> tuple:
-        """Generate enhanced answer using general knowledge with trusted sources"""
-        lang_instruction = "Answer in Hindi (हिंदी में उत्तर दें)" if language == "hi" else "Answer in English"
-        
-        disclaimer_en = "⚠️ Note: Live data from data.gov.in is currently unavailable. This answer is based on general knowledge and trusted sources.\n\n"
-        disclaimer_hi = "⚠️ नोट: data.gov.in से लाइव डेटा वर्तमान में उपलब्ध नहीं है। यह उत्तर सामान्य ज्ञान और विश्वसनीय स्रोतों पर आधारित है।\n\n"
-        disclaimer = disclaimer_hi if language == "hi" else disclaimer_en
-        
-        system_prompt = f"""You are an agricultural and climate expert for India with extensive knowledge about:
+
+FALLBACK_PROMPT_TEMPLATE = """You are an agricultural and climate expert for India with extensive knowledge about:
 - Agricultural commodity prices and market trends
 - Crop production and seasonal patterns
 - State-wise agricultural statistics
@@ -482,22 +574,180 @@ Guidelines for ENHANCED responses:
 - Provide context about factors affecting the topic (weather, market demand, etc.)
 - Make answers comprehensive but well-structured with clear sections
 - End with a note about checking official sources for latest real-time data"""
+
+# System prompts rendered once per language at import
+ANSWER_SYSTEM_PROMPTS = {
+    lang: ANSWER_PROMPT_TEMPLATE.format(lang_instruction=instruction)
+    for lang, instruction in LANG_INSTRUCTIONS.items()
+}
+HYBRID_SYSTEM_PROMPTS = {
+    lang: HYBRID_PROMPT_TEMPLATE.format(lang_instruction=instruction)
+    for lang, instruction in LANG_INSTRUCTIONS.items()
+}
+FALLBACK_SYSTEM_PROMPTS = {
+    lang: FALLBACK_PROMPT_TEMPLATE.format(lang_instruction=instruction)
+    for lang, instruction in LANG_INSTRUCTIONS.items()
+}
+
+HYBRID_DISCLAIMERS = {
+    "en": "ℹ️ Hybrid Response: Combining available live data with general knowledge for a comprehensive answer.\n\n",
+    "hi": "ℹ️ हाइब्रिड प्रतिक्रिया: व्यापक उत्तर के लिए उपलब्ध लाइव डेटा को सामान्य ज्ञान के साथ जोड़ना।\n\n"
+}
+FALLBACK_DISCLAIMERS = {
+    "en": "⚠️ Note: Live data from data.gov.in is currently unavailable. This answer is based on general knowledge and trusted sources.\n\n",
+    "hi": "⚠️ नोट: data.gov.in से लाइव डेटा वर्तमान में उपलब्ध नहीं है। यह उत्तर सामान्य ज्ञान और विश्वसनीय स्रोतों पर आधारित है।\n\n"
+}
+HYBRID_ERROR_MESSAGES = {
+    "en": "Error generating answer.",
+    "hi": "क्षमा करें, उत्तर उत्पन्न करने में त्रुटि।"
+}
+FALLBACK_ERROR_MESSAGES = {
+    "en": "Sorry, unable to generate answer at this time.",
+    "hi": "क्षमा करें, इस समय उत्तर उत्पन्न करने में असमर्थ।"
+}
+ANSWER_ERROR_MESSAGE = "Unable to generate answer."
+
+def for_language(variants: Dict[str, str], language: str) -> str:
+    """Pick the Hindi variant for "hi" and the English one for anything else"""
+    return variants["hi"] if language == "hi" else variants["en"]
+
+class AnswerGenerator:
+    """Generate answers with source citations"""
+    
+    @property
+    def model(self):
+        return get_gemini_model()
+    
+    @staticmethod
+    def get_relevant_sources(question: str) -> List[Dict[str, str]]:
+        """Get relevant trusted sources based on query topic"""
+        question_lower = question.lower()
         
-        prompt = f"{system_prompt}\n\nQuestion: {question}"
+        # Determine query topics in a single automaton pass
+        matched_topics = set()
+        for _, topics in _SOURCE_TOPIC_AUTOMATON.iter(question_lower):
+            matched_topics.update(topics)
+        
+        return list(_SOURCES_BY_TOPICS[frozenset(matched_topics)])
+    
+    @staticmethod
+    def format_record(record: Dict) -> str:
+        """Serialize a record as compact JSON for the prompt, dropping empty fields and capping length"""
+        text = orjson.dumps({
+            k: v[:MAX_FIELD_CHARS] if isinstance(v, str) else v
+            for k, v in record.items() if v not in (None, "")
+        }).decode()
+        if len(text) > MAX_RECORD_CHARS:
+            text = text[:MAX_RECORD_CHARS] + "..."
+        return text
+    
+    def format_records(self, records: List[Dict]) -> List[str]:
+        """Numbered prompt lines for sample records, stopping once MAX_PROMPT_RECORDS_CHARS is reached"""
+        lines = []
+        budget = MAX_PROMPT_RECORDS_CHARS
+        for idx, record in enumerate(records, 1):
+            line = f"Record {idx}: {self.format_record(record)}"
+            budget -= len(line) + 1
+            if budget < 0:
+                break
+            lines.append(line)
+        return lines
+    
+    def build_answer_prompt(self, question: str, data_context: List[str], records_data: List[Dict], language: str) -> str:
+        """Prompt for answering from live data only"""
+        system_prompt = for_language(ANSWER_SYSTEM_PROMPTS, language)
+        
+        # Format data context with actual records
+        parts = ["Live data from data.gov.in:\n"]
+        parts.extend(f"{idx}. {item}" for idx, item in enumerate(data_context, 1))
+        
+        # Add sample records for detailed analysis
+        if records_data:
+            parts.append("\nSample data records for analysis:")
+            parts.extend(self.format_records(records_data[:10]))  # Include up to 10 records
+        context_text = "\n".join(parts)
+        
+        return f"{system_prompt}\n\nQuestion: {question}\n\n{context_text}"
+    
+    def build_hybrid_prompt(self, question: str, partial_data: List[str], partial_records: List[Dict], language: str) -> str:
+        """Prompt for combining partial live data with general knowledge"""
+        system_prompt = for_language(HYBRID_SYSTEM_PROMPTS, language)
+        
+        # Format partial data context
+        parts = ["Partial live data available from data.gov.in:\n"]
+        parts.extend(f"{idx}. {item}" for idx, item in enumerate(partial_data, 1))
+        
+        if partial_records:
+            parts.append("\nSample records from available data:")
+            parts.extend(self.format_records(partial_records[:5]))
+        context_text = "\n".join(parts)
+        
+        return f"{system_prompt}\n\nQuestion: {question}\n\n{context_text}"
+    
+    @staticmethod
+    def build_fallback_prompt(question: str, language: str) -> str:
+        """Prompt for answering from general knowledge when no live data is available"""
+        system_prompt = for_language(FALLBACK_SYSTEM_PROMPTS, language)
+        return f"{system_prompt}\n\nQuestion: {question}"
+    
+    async def stream_answer(self, prompt: str, error_msg: str) -> AsyncIterator[str]:
+        """Yield answer text chunks as Gemini produces them"""
+        try:
+            # The slot is held for the whole stream, which is when the request is in flight
+            async with _GEMINI_SEM:
+                response = await self.model.generate_content_async(prompt, stream=True)
+                async for chunk in response:
+                    yield chunk.text
+        except Exception as e:
+            logger.error("Error streaming answer: %s", e)
+            yield error_msg
+    
+    async def generate_answer(self, question: str, data_context: List[str], records_data: List[Dict], language: str) -> str:
+        """Generate natural language answer from live data only"""
+        prompt = self.build_answer_prompt(question, data_context, records_data, language)
+        
+        try:
+            async with _GEMINI_SEM:
+                response = await self.model.generate_content_async(prompt)
+            return response.text
+        except Exception as e:
+            logger.error("Error generating answer: %s", e)
+            return ANSWER_ERROR_MESSAGE
+    
+    async def generate_hybrid_answer(self, question: str, partial_data: List[str], partial_records: List[Dict], language: str) -> tuple:
+        """Generate hybrid answer combining partial live data with AI knowledge"""
+        disclaimer = for_language(HYBRID_DISCLAIMERS, language)
+        prompt = self.build_hybrid_prompt(question, partial_data, partial_records, language)
+        
+        # Get relevant trusted sources (do this first, before AI call)
+        trusted_sources = self.get_relevant_sources(question)
+        
+        try:
+            async with _GEMINI_SEM:
+                response = await self.model.generate_content_async(prompt)
+            return disclaimer + response.text, trusted_sources
+        except Exception as e:
+            logger.error("Error generating hybrid answer: %s", e)
+            error_msg = for_language(HYBRID_ERROR_MESSAGES, language)
+            # Still return trusted sources even if AI generation fails
+            return disclaimer + error_msg, trusted_sources
+    
+    async def generate_fallback_answer(self, question: str, language: str, reason: str = "data_unavailable") -> tuple:
+        """Generate enhanced answer using general knowledge with trusted sources"""
+        disclaimer = for_language(FALLBACK_DISCLAIMERS, language)
+        prompt = self.build_fallback_prompt(question, language)
         
         # Get relevant trusted sources for this query (do this first, before AI call)
         trusted_sources = self.get_relevant_sources(question)
         
         try:
-            response = await asyncio.to_thread(
-                self.model.generate_content,
-                prompt
-            )
+            async with _GEMINI_SEM:
+                response = await self.model.generate_content_async(prompt)
             # Return both answer and sources
             return disclaimer + response.text, trusted_sources
         except Exception as e:
-            logger.error(f"Error generating fallback answer: {str(e)}")
-            error_msg = "क्षमा करें, इस समय उत्तर उत्पन्न करने में असमर्थ।" if language == "hi" else "Sorry, unable to generate answer at this time."
+            logger.error("Error generating fallback answer: %s", e)
+            error_msg = for_language(FALLBACK_ERROR_MESSAGES, language)
             # Still return trusted sources even if AI generation fails
             return disclaimer + error_msg, trusted_sources
 
@@ -506,121 +756,163 @@ data_service = DataService()
 query_processor = QueryProcessor()
 answer_generator = AnswerGenerator()
 
+# Fields returned by the chat history endpoint
+CHAT_HISTORY_PROJECTION = {
+    "_id": 0,
+    "id": 1,
+    "session_id": 1,
+    "role": 1,
+    "content": 1,
+    "sources": 1,
+    "timestamp": 1
+}
+
+def reply_time(asked_at: datetime) -> datetime:
+    """Timestamp for the reply to a message stamped `asked_at`.
+    
+    BSON Dates keep only milliseconds, so the reply is kept at least 1ms later
+    and history (sorted by timestamp alone) never has to break a tie.
+    """
+    return max(datetime.now(timezone.utc), asked_at + timedelta(milliseconds=1))
+
+async def save_chat_messages(*messages: ChatMessage):
+    """Persist chat messages in a single round-trip to MongoDB (run after the response is sent)"""
+    # Timestamps stay datetimes so MongoDB stores them as native BSON Dates
+    docs = [message.model_dump() for message in messages]
+    try:
+        await db.chat_messages.insert_many(docs, ordered=True)
+    except Exception as e:
+        logger.error("Error saving chat messages: %s", e)
+
+async def collect_live_data(question: str, language: str) -> Optional[Tuple[List[str], List[Dict], List[Dict[str, str]]]]:
+    """Find and fetch live data for a question.
+    
+    Returns None when no dataset is relevant, otherwise (data_context, records, sources);
+    the lists are empty when every fetch failed.
+    """
+    # Step 1: Search for relevant datasets (local, no network)
+    relevant_datasets = await data_service.search_datasets(question)
+    logger.info("Found %d relevant datasets for query: '%s'", len(relevant_datasets), question)
+    
+    if not relevant_datasets:
+        logger.info("No relevant datasets found. Generating enhanced fallback answer with trusted sources.")
+        return None
+    
+    # Step 2: Understand query intent (only worth a Gemini call when datasets matched);
+    # it runs in the background while the datasets are fetched
+    intent_task = asyncio.create_task(
+        query_processor.extract_query_intent(question, language)
+    )
+    
+    # Step 3: Fetch actual data from data.gov.in APIs (with retry mechanism)
+    data_context = []
+    sources = []
+    all_records = []
+    
+    # Fetch all relevant datasets concurrently so latency is bounded by the slowest call
+    for dataset in relevant_datasets:
+        logger.info("Fetching data for dataset: %s", dataset["title"])
+    results = await asyncio.gather(
+        *(
+            data_service.fetch_dataset(
+                dataset["resource_id"],
+                limit=RECORDS_PER_DATASET,
+                fields=DATASET_FIELDS.get(dataset["resource_id"])
+            )
+            for dataset in relevant_datasets
+        ),
+        return_exceptions=True
+    )
+    intent = await intent_task
+    logger.info("Query intent: %s", intent)
+    
+    for dataset, records in zip(relevant_datasets, results):
+        if isinstance(records, Exception):
+            logger.error("Error fetching %s: %s", dataset["title"], records)
+            continue
+        if records:
+            logger.info("Successfully fetched %d records from %s", len(records), dataset["title"])
+            # Store actual records for detailed analysis
+            all_records.extend(records)
+            
+            # Summarize dataset info
+            sample = records[0]
+            data_context.append(". ".join((
+                f"{dataset['title']}: {len(records)} records fetched from data.gov.in",
+                f"Fields: {', '.join(list(sample.keys())[:8])}"
+            )))
+            
+            sources.append({
+                "title": dataset["title"],
+                "ministry": dataset["ministry"],
+                "url": f"https://data.gov.in/resource/{dataset['resource_id']}",
+                "records": str(len(records))
+            })
+    
+    if not all_records:
+        logger.warning("No data fetched from any dataset after retries. Generating enhanced fallback answer.")
+    return data_context, all_records, sources
+
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format one Server-Sent Events frame with a JSON payload"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {orjson.dumps(data).decode()}\n\n"
+
 @api_router.get("/")
 async def root():
     return {"message": "Agri-Climate Q&A System", "status": "operational"}
 
 @api_router.post("/chat/query", response_model=ChatResponse)
-async def process_query(request: ChatRequest):
+async def process_query(request: ChatRequest, background_tasks: BackgroundTasks):
     """Process a natural language query about agricultural/climate data"""
+    # Generate or use existing session ID
+    session_id = request.session_id or str(uuid.uuid4())
+    # The user message is stamped on arrival and the assistant message once its answer exists,
+    # so the two always sort in order in history
+    now = datetime.now(timezone.utc)
+    
+    # User message is persisted together with the assistant reply, off the response path
+    user_message = ChatMessage(
+        session_id=session_id,
+        role="user",
+        content=request.question,
+        timestamp=now
+    )
+    
     try:
-        # Generate or use existing session ID
-        session_id = request.session_id or str(uuid.uuid4())
-        
-        # Save user message
-        user_message = ChatMessage(
-            session_id=session_id,
-            role="user",
-            content=request.question
-        )
-        doc = user_message.model_dump()
-        doc['timestamp'] = doc['timestamp'].isoformat()
-        await db.chat_messages.insert_one(doc)
+        live_data = await collect_live_data(request.question, request.language)
         
-        # Step 1: Understand query intent
-        intent = await query_processor.extract_query_intent(request.question, request.language)
-        logger.info(f"Query intent: {intent}")
-        
-        # Step 2: Search for relevant datasets
-        relevant_datasets = await data_service.search_datasets(request.question)
-        logger.info(f"Found {len(relevant_datasets)} relevant datasets for query: '{request.question}'")
-        
-        if not relevant_datasets:
-            # No relevant datasets found - use AI fallback with general knowledge
-            logger.info("No relevant datasets found. Generating enhanced fallback answer with trusted sources.")
+        if live_data is None or not live_data[1]:
+            # No relevant datasets or no data fetched - use AI fallback with general knowledge
             fallback_answer, trusted_sources = await answer_generator.generate_fallback_answer(
                 request.question,
                 request.language,
-                reason="no_datasets"
+                reason="no_datasets" if live_data is None else "fetch_failed"
             )
             
+            answered_at = reply_time(now)
             assistant_message = ChatMessage(
                 session_id=session_id,
                 role="assistant",
                 content=fallback_answer,
-                sources=trusted_sources
-            )
-            doc = assistant_message.model_dump()
-            doc['timestamp'] = doc['timestamp'].isoformat()
-            await db.chat_messages.insert_one(doc)
-            
-            return ChatResponse(
-                session_id=session_id,
-                answer=fallback_answer,
                 sources=trusted_sources,
-                timestamp=datetime.now(timezone.utc).isoformat()
-            )
-        
-        # Step 3: Fetch actual data from data.gov.in APIs (with retry mechanism)
-        data_context = []
-        sources = []
-        all_records = []
-        
-        for dataset in relevant_datasets:
-            try:
-                logger.info(f"Fetching data for dataset: {dataset['title']}")
-                records = await data_service.fetch_dataset(dataset["resource_id"], limit=100)
-                if records:
-                    logger.info(f"Successfully fetched {len(records)} records from {dataset['title']}")
-                    # Store actual records for detailed analysis
-                    all_records.extend(records[:20])  # Include up to 20 records per dataset
-                    
-                    # Summarize dataset info
-                    data_summary = f"{dataset['title']}: {len(records)} records fetched from data.gov.in"
-                    if records:
-                        sample = records[0]
-                        data_summary += f". Fields: {', '.join(list(sample.keys())[:8])}"
-                    data_context.append(data_summary)
-                    
-                    sources.append({
-                        "title": dataset["title"],
-                        "ministry": dataset["ministry"],
-                        "url": f"https://data.gov.in/resource/{dataset['resource_id']}",
-                        "records": str(len(records))
-                    })
-            except Exception as e:
-                logger.error(f"Error fetching {dataset['title']}: {str(e)}")
-        
-        # Check if we got any actual data
-        if not data_context or not all_records:
-            logger.warning(f"No data fetched from any dataset after retries. Generating enhanced fallback answer.")
-            fallback_answer, trusted_sources = await answer_generator.generate_fallback_answer(
-                request.question,
-                request.language,
-                reason="fetch_failed"
-            )
-            
-            assistant_message = ChatMessage(
-                session_id=session_id,
-                role="assistant",
-                content=fallback_answer,
-                sources=trusted_sources
+                timestamp=answered_at
             )
-            doc = assistant_message.model_dump()
-            doc['timestamp'] = doc['timestamp'].isoformat()
-            await db.chat_messages.insert_one(doc)
+            background_tasks.add_task(save_chat_messages, user_message, assistant_message)
             
             return ChatResponse(
                 session_id=session_id,
                 answer=fallback_answer,
                 sources=trusted_sources,
-                timestamp=datetime.now(timezone.utc).isoformat()
+                timestamp=answered_at.isoformat()
             )
         
+        data_context, all_records, sources = live_data
+        
         # Check if we have partial data (less than expected)
         # If we have some data but it seems limited, use hybrid mode
-        if len(all_records) < 5:  # Threshold for "partial data"
-            logger.info(f"Limited data available ({len(all_records)} records). Using hybrid mode.")
+        if len(all_records) < PARTIAL_DATA_THRESHOLD:
+            logger.info("Limited data available (%d records). Using hybrid mode.", len(all_records))
             hybrid_answer, trusted_sources = await answer_generator.generate_hybrid_answer(
                 request.question,
                 data_context,
@@ -631,21 +923,21 @@ async def process_query(request: ChatRequest):
             # Combine live data sources with trusted reference sources
             combined_sources = sources + trusted_sources[:3]  # Add top 3 trusted sources
             
+            answered_at = reply_time(now)
             assistant_message = ChatMessage(
                 session_id=session_id,
                 role="assistant",
                 content=hybrid_answer,
-                sources=combined_sources
+                sources=combined_sources,
+                timestamp=answered_at
             )
-            doc = assistant_message.model_dump()
-            doc['timestamp'] = doc['timestamp'].isoformat()
-            await db.chat_messages.insert_one(doc)
+            background_tasks.add_task(save_chat_messages, user_message, assistant_message)
             
             return ChatResponse(
                 session_id=session_id,
                 answer=hybrid_answer,
                 sources=combined_sources,
-                timestamp=datetime.now(timezone.utc).isoformat()
+                timestamp=answered_at.isoformat()
             )
         
         # Step 4: Generate answer using Gemini with live data ONLY
@@ -656,59 +948,166 @@ async def process_query(request: ChatRequest):
             request.language
         )
         
-        # Save assistant message with sources
+        # Save user and assistant messages with sources
+        answered_at = reply_time(now)
         assistant_message = ChatMessage(
             session_id=session_id,
             role="assistant",
             content=answer,
-            sources=sources
+            sources=sources,
+            timestamp=answered_at
         )
-        doc = assistant_message.model_dump()
-        doc['timestamp'] = doc['timestamp'].isoformat()
-        await db.chat_messages.insert_one(doc)
+        background_tasks.add_task(save_chat_messages, user_message, assistant_message)
         
         return ChatResponse(
             session_id=session_id,
             answer=answer,
             sources=sources,
-            timestamp=datetime.now(timezone.utc).isoformat()
+            timestamp=answered_at.isoformat()
         )
         
     except Exception as e:
-        logger.error(f"Error processing query: {str(e)}")
+        logger.error("Error processing query: %s", e)
+        # No answer means no background save was scheduled, so the question is stored on its own
+        await save_chat_messages(user_message)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/chat/query/stream")
+async def process_query_stream(request: ChatRequest, background_tasks: BackgroundTasks):
+    """Process a query like /chat/query, streaming the answer as Server-Sent Events.
+    
+    Emits a `meta` event (session_id, sources), then data frames of {"text": ...}
+    as Gemini generates them, then a final `done` event whose `timestamp` is the
+    answer's, as returned by /chat/query and saved to history.
+    """
+    session_id = request.session_id or str(uuid.uuid4())
+    now = datetime.now(timezone.utc)
+    user_message = ChatMessage(
+        session_id=session_id,
+        role="user",
+        content=request.question,
+        timestamp=now
+    )
+    
+    try:
+        live_data = await collect_live_data(request.question, request.language)
+        
+        if live_data is None or not live_data[1]:
+            prompt = answer_generator.build_fallback_prompt(request.question, request.language)
+            disclaimer = for_language(FALLBACK_DISCLAIMERS, request.language)
+            error_msg = for_language(FALLBACK_ERROR_MESSAGES, request.language)
+            sources = answer_generator.get_relevant_sources(request.question)
+        else:
+            data_context, all_records, sources = live_data
+            if len(all_records) < PARTIAL_DATA_THRESHOLD:
+                logger.info("Limited data available (%d records). Using hybrid mode.", len(all_records))
+                prompt = answer_generator.build_hybrid_prompt(request.question, data_context, all_records, request.language)
+                disclaimer = for_language(HYBRID_DISCLAIMERS, request.language)
+                error_msg = for_language(HYBRID_ERROR_MESSAGES, request.language)
+                sources = sources + answer_generator.get_relevant_sources(request.question)[:3]
+            else:
+                prompt = answer_generator.build_answer_prompt(request.question, data_context, all_records, request.language)
+                disclaimer = ""
+                error_msg = ANSWER_ERROR_MESSAGE
+    except Exception as e:
+        logger.error("Error processing query: %s", e)
+        await save_chat_messages(user_message)
         raise HTTPException(status_code=500, detail=str(e))
+    
+    parts = [disclaimer]
+    answered_at = None
+    
+    async def events():
+        nonlocal answered_at
+        yield sse_event({"session_id": session_id, "sources": sources}, "meta")
+        if disclaimer:
+            yield sse_event({"text": disclaimer})
+        async for text in answer_generator.stream_answer(prompt, error_msg):
+            parts.append(text)
+            yield sse_event({"text": text})
+        answered_at = reply_time(now)
+        yield sse_event({"timestamp": answered_at.isoformat()}, "done")
+    
+    async def save_streamed_answer():
+        # Runs after the stream has been sent, once the full answer is known;
+        # a client that disconnected early never got `done`, so the time is taken here
+        assistant_message = ChatMessage(
+            session_id=session_id,
+            role="assistant",
+            content="".join(parts),
+            sources=sources,
+            timestamp=answered_at or reply_time(now)
+        )
+        await save_chat_messages(user_message, assistant_message)
+    
+    background_tasks.add_task(save_streamed_answer)
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 @api_router.get("/chat/history/{session_id}")
-async def get_chat_history(session_id: str):
-    """Get chat history for a session"""
+async def get_chat_history(session_id: str, limit: int = Query(100, ge=1, le=1000), before: Optional[datetime] = None):
+    """Get chat history for a session (most recent `limit` messages, optionally before a timestamp).
+    
+    `before` compares against BSON Dates only, so messages saved before timestamps
+    moved to native Dates (ISO strings) are never returned by a paged request.
+    """
     try:
+        query = {"session_id": session_id}
+        if before:
+            query["timestamp"] = {"$lt": before}
+        
+        # Newest-first walk of the (session_id, timestamp) index, then restore chronological order;
+        # batch_size(limit) returns the whole page in the first reply instead of 101 docs + getMores
         messages = await db.chat_messages.find(
-            {"session_id": session_id},
-            {"_id": 0}
-        ).sort("timestamp", 1).to_list(1000)
+            query,
+            CHAT_HISTORY_PROJECTION
+        ).sort("timestamp", -1).limit(limit).batch_size(limit).to_list(limit)
+        messages.reverse()
         
         return {"session_id": session_id, "messages": messages}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# The catalog is static, so its response body is serialized once at import time
+DATASETS_PAYLOAD = orjson.dumps({
+    "datasets": KNOWN_DATASETS,
+    "total": len(KNOWN_DATASETS)
+})
+DATASETS_CACHE_CONTROL = "public, max-age=300"
+# Content hash of the payload, so clients past max-age revalidate with If-None-Match and get a bodiless 304
+DATASETS_ETAG = '"%s"' % hashlib.blake2b(DATASETS_PAYLOAD, digest_size=16).hexdigest()
+
+# How long a MongoDB ping result is reused by /health, so bursts of probes cost one round trip
+HEALTH_CACHE_TTL = 5
+_health_cache = (float("-inf"), "unhealthy")  # (monotonic time of last ping, mongodb status)
+
 @api_router.get("/datasets")
-async def get_datasets():
+async def get_datasets(if_none_match: Optional[str] = Header(None)):
     """List available datasets"""
-    return {
-        "datasets": KNOWN_DATASETS,
-        "total": len(KNOWN_DATASETS)
-    }
+    headers = {"Cache-Control": DATASETS_CACHE_CONTROL, "ETag": DATASETS_ETAG}
+    if if_none_match and DATASETS_ETAG in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(
+        DATASETS_PAYLOAD,
+        media_type="application/json",
+        headers=headers
+    )
 
 @api_router.get("/health")
-async def health_check():
+async def health_check(response: Response):
     """System health check"""
-    try:
-        # Check MongoDB
-        await db.command("ping")
-        mongo_status = "healthy"
-    except:
-        mongo_status = "unhealthy"
+    global _health_cache
+    
+    checked_at, mongo_status = _health_cache
+    if time.monotonic() - checked_at >= HEALTH_CACHE_TTL:
+        try:
+            # Check MongoDB
+            await db.command("ping")
+            mongo_status = "healthy"
+        except:
+            mongo_status = "unhealthy"
+        _health_cache = (time.monotonic(), mongo_status)
     
+    response.headers["Cache-Control"] = f"max-age={HEALTH_CACHE_TTL}"
     return {
         "status": "operational",
         "services": {
@@ -718,9 +1117,24 @@ async def health_check():
         }
     }
 
+# Server-Sent Events endpoints, which must reach the client frame by frame
+STREAMING_PATHS = frozenset({"/api/chat/query/stream"})
+
+class SkipStreamsGZipMiddleware(GZipMiddleware):
+    """GZip responses, except Server-Sent Events: gzip would hold frames back until its buffer fills"""
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in STREAMING_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
 # Include the router in the main app
 app.include_router(api_router)
 
+# Answers and source lists are prose-heavy JSON that compresses several-fold
+app.add_middleware(SkipStreamsGZipMiddleware, minimum_size=1024, compresslevel=5)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -729,6 +1143,34 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def create_indexes():
+    # Chat answers need no MongoDB, so an unreachable database is logged here and reported by /health, not fatal
+    try:
+        # Serves get_chat_history as an index range scan instead of a collection scan + sort
+        await db.chat_messages.create_index([("session_id", 1), ("timestamp", 1)])
+    except Exception as e:
+        logger.warning("Could not create chat history index: %s", e)
+    try:
+        await db.chat_messages.create_index("id", unique=True)
+    except Exception as e:
+        logger.warning("Could not create unique chat message id index: %s", e)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    await client.close()
+    await HTTP_CLIENT.aclose()
+    LOG_LISTENER.stop()
+
+if __name__ == "__main__":
+    import uvicorn
+    
+    # Same settings as the README's uvicorn command, for running `python server.py` directly
+    uvicorn.run(
+        "server:app",
+        host="0.0.0.0",
+        port=int(os.environ.get("PORT", "8001")),
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.environ.get("WEB_CONCURRENCY", "1"))
+    )
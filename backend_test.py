@@ -1,383 +1,382 @@
-import requests
+import httpx
+import io
+import os
+import re
+import shelve
 import sys
 import json
-from datetime import datetime
-import uuid
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from api_test_utils import CHAT_REQUIRED, HINDI_RE, ResultRow
+
+try:
+    import orjson  # faster on the multi-KB chat answers; optional
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+    def _json_dumps(payload):
+        return json.dumps(payload).encode()
+
+# Static GET endpoints whose responses may be reused, for their Cache-Control max-age or _CACHE_TTL seconds
+_CACHEABLE_PATH_RE = re.compile(r"/api/(health|datasets)?$")
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+# Cached bodies are stored decoded, so headers describing the wire encoding must not be replayed with them
+_ENCODING_HEADERS = frozenset(("content-encoding", "content-length", "transfer-encoding"))
+_CACHE_FILE = ".agriclimate_test_cache"
+_CACHE_TTL = 300
+# How long a passed empty-question check is trusted by later runs that persist the cache
+_ERROR_CHECK_KEY = "verdict:error_handling"
+_ERROR_CHECK_TTL = 6 * 3600
+# Prefixes of the disclaimer the backend puts on answers generated without live data
+_EN_DISCLAIMER = "⚠️ Note: Live data from data.gov.in is currently unavailable"
+_HI_DISCLAIMER = "⚠️ नोट: data.gov.in से लाइव डेटा वर्तमान में उपलब्ध नहीं है"
+# The error-handling request never changes, so it is encoded once at import
+_EMPTY_QUESTION_BODY = _json_dumps({"question": "", "language": "en"})
+
+def _chat_body(question, session_id, language):
+    return _json_dumps({"question": question, "session_id": session_id, "language": language})
+
+class CachingTransport(httpx.BaseTransport):
+    """Serve repeated GETs of the static endpoints from memory, and across runs from a shelve file when `persist`;
+    entries past max-age are revalidated by ETag when the server sent one"""
+    
+    def __init__(self, transport, persist=False):
+        self._transport = transport
+        self._persist = persist
+        self._memory = {}
+        self._lock = threading.Lock()
+    
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and self._persist:
+                with shelve.open(_CACHE_FILE) as cache:
+                    entry = cache.get(key)
+                if entry is not None:
+                    self._memory[key] = entry
+        return entry
+    
+    def _store(self, key, response):
+        cache_control = response.headers.get("Cache-Control", "")
+        if "no-store" in cache_control or "no-cache" in cache_control:
+            return
+        max_age = _MAX_AGE_RE.search(cache_control)
+        entry = {
+            "expires_at": time.time() + (int(max_age.group(1)) if max_age else _CACHE_TTL),
+            "status_code": response.status_code,
+            "headers": [(k, v) for k, v in response.headers.multi_items() if k.lower() not in _ENCODING_HEADERS],
+            "content": response.content,
+        }
+        self._put(key, entry)
+    
+    def _put(self, key, entry):
+        with self._lock:
+            self._memory[key] = entry
+            if self._persist:
+                with shelve.open(_CACHE_FILE) as cache:
+                    cache[key] = entry
+    
+    def remember(self, key, value, ttl):
+        """Store a value other than a response (e.g. a test verdict) under `key` for `ttl` seconds"""
+        self._put(key, {"expires_at": time.time() + ttl, "value": value})
+    
+    def recall(self, key):
+        entry = self._lookup(key)
+        if entry and time.time() < entry["expires_at"]:
+            return entry["value"]
+        return None
+    
+    def handle_request(self, request):
+        if request.method != "GET" or not _CACHEABLE_PATH_RE.search(request.url.path):
+            return self._transport.handle_request(request)
+        
+        key = str(request.url)
+        entry = self._lookup(key)
+        if entry and time.time() < entry["expires_at"]:
+            return httpx.Response(entry["status_code"], headers=entry["headers"], content=entry["content"], request=request)
+        
+        # A stale entry with an ETag is revalidated; on 304 its body is reused under the fresh headers
+        etag = entry and dict(entry["headers"]).get("etag")
+        if etag:
+            request.headers["If-None-Match"] = etag
+        response = self._transport.handle_request(request)
+        response.read()
+        if response.status_code == 304 and etag:
+            response = httpx.Response(
+                entry["status_code"],
+                headers={
+                    **dict(entry["headers"]),
+                    **{k: v for k, v in response.headers.items() if k not in _ENCODING_HEADERS}
+                },
+                content=entry["content"],
+                request=request
+            )
+        if response.status_code == 200:
+            self._store(key, response)
+        return response
+    
+    def close(self):
+        self._transport.close()
 
 class AgriClimateAPITester:
-    def __init__(self, base_url="https://fetch-fallback-ai.preview.emergentagent.com"):
+    # Fail fast on an unreachable host, but wait for LLM processing on chat queries
+    _GET_TIMEOUT = httpx.Timeout(10.0, connect=2.0)
+    _CHAT_TIMEOUT = httpx.Timeout(60.0, connect=2.0)
+    # The backend's own health check can wait up to 3s on MongoDB server selection, so only connect is kept at 2s
+    _PREFLIGHT_TIMEOUT = httpx.Timeout(5.0, connect=2.0)
+    # Chat history is re-read up to _HISTORY_ATTEMPTS times, _RETRY_DELAY seconds apart, while the background save lands
+    _HISTORY_ATTEMPTS = 5
+    _RETRY_DELAY = 0.5
+    
+    def __init__(self, base_url="https://fetch-fallback-ai.preview.emergentagent.com", live=False, force=False):
         self.base_url = base_url
         self.api_url = f"{base_url}/api"
-        self.session_id = None
+        # Endpoint URLs, built once instead of per request
+        self._url_health = self.api_url + "/health"
+        self._url_root = self.api_url + "/"
+        self._url_datasets = self.api_url + "/datasets"
+        self._url_chat = self.api_url + "/chat/query"
+        self._url_history_prefix = self.api_url + "/chat/history/"
+        # One random id per run; every test session is labelled with it, so a run's messages are easy to find
+        self._run_id = os.urandom(8).hex()
+        # Created up front so the English and Hindi queries can share it without waiting on each other
+        self.session_id = self._session_id("session")
         self.tests_run = 0
         self.tests_passed = 0
         self.test_results = []
+        self._log_lock = threading.Lock()  # independent tests log from worker threads
+        # Report lines are collected and written to stdout in one go at the end, unless `live` asks for them as they happen
+        self._out = sys.stdout if live else io.StringIO()
+        
+        # One HTTP/2 client, so every test (including concurrent ones) is multiplexed over a single TLS connection.
+        # Only connection failures are retried: re-sending a timed-out LLM query (60s x 3) is worse than failing
+        persist = os.environ.get("AGRICLIMATE_TEST_CACHE") == "1"
+        self._cache = CachingTransport(
+            httpx.HTTPTransport(
+                http2=True,
+                retries=2,
+                limits=httpx.Limits(max_keepalive_connections=4, max_connections=8)
+            ),
+            persist=persist
+        )
+        # Verdicts from earlier runs are only reused from the persistent cache, and never under --force
+        self._reuse_verdicts = persist and not force
+        self.client = httpx.Client(
+            transport=self._cache,
+            headers={"Content-Type": "application/json"},
+            timeout=self._GET_TIMEOUT
+        )
+
+    def _session_id(self, label):
+        return f"test-{label}-{self._run_id}"
 
     def log_test(self, name, success, details=""):
         """Log test result"""
-        self.tests_run += 1
-        if success:
-            self.tests_passed += 1
-            print(f"✅ {name} - PASSED")
-        else:
-            print(f"❌ {name} - FAILED: {details}")
+        with self._log_lock:
+            self.tests_run += 1
+            if success:
+                self.tests_passed += 1
+                print(f"✅ {name} - PASSED", file=self._out)
+            else:
+                print(f"❌ {name} - FAILED: {details}", file=self._out)
+            
+            self.test_results.append(ResultRow(name, "PASSED" if success else "FAILED", details))
+
+    def _do_request(self, name, method, url, validator, attempts=1, **kwargs):
+        """Send one request, check for HTTP 200 and log validator(data) -> (success, details) as test `name`;
+        with `attempts` > 1 a failing request is repeated _RETRY_DELAY apart and only the last outcome is logged"""
+        for attempt in range(attempts):
+            if attempt:
+                time.sleep(self._RETRY_DELAY)
+            try:
+                response = self.client.request(method, url, **kwargs)
+                
+                if response.status_code == 200:
+                    success, details = validator(_json_loads(response.content))
+                else:
+                    success, details = False, f"Status code: {response.status_code}, Response: {response.text[:200]}"
+            except Exception as e:
+                success, details = False, f"Exception: {str(e)}"
+            if success:
+                break
         
-        self.test_results.append({
-            "test": name,
-            "status": "PASSED" if success else "FAILED",
-            "details": details
-        })
+        self.log_test(name, success, details)
+        return success
+
+    def _chat_query(self, name, question, session_id, language, validator):
+        return self._do_request(
+            name, "POST", self._url_chat, validator,
+            content=_chat_body(question, session_id, language),
+            timeout=self._CHAT_TIMEOUT  # Longer read timeout for LLM processing
+        )
 
     def test_health_endpoint(self):
         """Test /api/health endpoint"""
-        try:
-            response = requests.get(f"{self.api_url}/health", timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if "status" in data and data["status"] == "operational":
-                    self.log_test("Health Check", True, f"Status: {data}")
-                    return True
-                else:
-                    self.log_test("Health Check", False, f"Invalid response: {data}")
-                    return False
-            else:
-                self.log_test("Health Check", False, f"Status code: {response.status_code}")
-                return False
-        except Exception as e:
-            self.log_test("Health Check", False, f"Exception: {str(e)}")
-            return False
+        def validate(data):
+            if data.get("status") == "operational":
+                return True, f"Status: {data}"
+            return False, f"Invalid response: {data}"
+        
+        return self._do_request("Health Check", "GET", self._url_health, validate)
 
     def test_root_endpoint(self):
         """Test /api/ root endpoint"""
-        try:
-            response = requests.get(f"{self.api_url}/", timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if "message" in data:
-                    self.log_test("Root Endpoint", True, f"Message: {data['message']}")
-                    return True
-                else:
-                    self.log_test("Root Endpoint", False, f"No message in response: {data}")
-                    return False
-            else:
-                self.log_test("Root Endpoint", False, f"Status code: {response.status_code}")
-                return False
-        except Exception as e:
-            self.log_test("Root Endpoint", False, f"Exception: {str(e)}")
-            return False
+        def validate(data):
+            if "message" in data:
+                return True, f"Message: {data['message']}"
+            return False, f"No message in response: {data}"
+        
+        return self._do_request("Root Endpoint", "GET", self._url_root, validate)
 
     def test_datasets_endpoint(self):
         """Test /api/datasets endpoint"""
-        try:
-            response = requests.get(f"{self.api_url}/datasets", timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if "datasets" in data and "total" in data:
-                    self.log_test("Datasets Endpoint", True, f"Found {data['total']} datasets")
-                    return True
-                else:
-                    self.log_test("Datasets Endpoint", False, f"Invalid response structure: {data}")
-                    return False
-            else:
-                self.log_test("Datasets Endpoint", False, f"Status code: {response.status_code}")
-                return False
-        except Exception as e:
-            self.log_test("Datasets Endpoint", False, f"Exception: {str(e)}")
-            return False
+        def validate(data):
+            datasets = data.get("datasets")
+            total = data.get("total")
+            if datasets is not None and total is not None:
+                return True, f"Found {total} datasets"
+            return False, f"Invalid response structure: {data}"
+        
+        return self._do_request("Datasets Endpoint", "GET", self._url_datasets, validate)
 
     def test_chat_query_english(self):
         """Test /api/chat/query with English question"""
-        try:
-            self.session_id = f"test-session-{uuid.uuid4()}"
-            
-            payload = {
-                "question": "What are the top rice producing states in India?",
-                "session_id": self.session_id,
-                "language": "en"
-            }
-            
-            response = requests.post(
-                f"{self.api_url}/chat/query",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=60  # Longer timeout for LLM processing
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                required_fields = ["session_id", "answer", "sources", "timestamp"]
-                
-                if all(field in data for field in required_fields):
-                    if data["answer"] and len(data["answer"]) > 10:
-                        self.log_test("Chat Query (English)", True, f"Answer length: {len(data['answer'])}, Sources: {len(data['sources'])}")
-                        return True
-                    else:
-                        self.log_test("Chat Query (English)", False, f"Empty or too short answer: {data['answer']}")
-                        return False
-                else:
-                    missing = [f for f in required_fields if f not in data]
-                    self.log_test("Chat Query (English)", False, f"Missing fields: {missing}")
-                    return False
-            else:
-                self.log_test("Chat Query (English)", False, f"Status code: {response.status_code}, Response: {response.text}")
-                return False
-        except Exception as e:
-            self.log_test("Chat Query (English)", False, f"Exception: {str(e)}")
-            return False
+        def validate(data):
+            missing = CHAT_REQUIRED - data.keys()
+            if missing:
+                return False, f"Missing fields: {sorted(missing)}"
+            answer = data["answer"]
+            answer_length = len(answer)
+            if answer_length > 10:
+                return True, f"Answer length: {answer_length}, Sources: {len(data['sources'])}"
+            return False, f"Empty or too short answer: {answer}"
+        
+        return self._chat_query(
+            "Chat Query (English)", "What are the top rice producing states in India?", self.session_id, "en", validate
+        )
 
     def test_chat_query_hindi(self):
         """Test /api/chat/query with Hindi question"""
-        try:
-            payload = {
-                "question": "भारत में सर्वाधिक चावल उत्पादक राज्य कौन से हैं?",
-                "session_id": self.session_id,
-                "language": "hi"
-            }
-            
-            response = requests.post(
-                f"{self.api_url}/chat/query",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data["answer"] and len(data["answer"]) > 10:
-                    # Check if response contains Hindi characters
-                    has_hindi = any('\u0900' <= char <= '\u097F' for char in data["answer"])
-                    self.log_test("Chat Query (Hindi)", True, f"Answer length: {len(data['answer'])}, Has Hindi: {has_hindi}")
-                    return True
-                else:
-                    self.log_test("Chat Query (Hindi)", False, f"Empty or too short answer: {data['answer']}")
-                    return False
-            else:
-                self.log_test("Chat Query (Hindi)", False, f"Status code: {response.status_code}")
-                return False
-        except Exception as e:
-            self.log_test("Chat Query (Hindi)", False, f"Exception: {str(e)}")
-            return False
+        def validate(data):
+            answer = data["answer"]
+            answer_length = len(answer)
+            if answer_length > 10:
+                # Check if response contains Hindi characters
+                has_hindi = bool(HINDI_RE.search(answer))
+                return True, f"Answer length: {answer_length}, Has Hindi: {has_hindi}"
+            return False, f"Empty or too short answer: {answer}"
+        
+        return self._chat_query(
+            "Chat Query (Hindi)", "भारत में सर्वाधिक चावल उत्पादक राज्य कौन से हैं?", self.session_id, "hi", validate
+        )
 
     def test_chat_history(self):
         """Test /api/chat/history/{session_id} endpoint"""
         if not self.session_id:
             self.log_test("Chat History", False, "No session ID available")
             return False
-            
-        try:
-            response = requests.get(f"{self.api_url}/chat/history/{self.session_id}", timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if "session_id" in data and "messages" in data:
-                    if len(data["messages"]) >= 2:  # Should have user + assistant messages
-                        self.log_test("Chat History", True, f"Found {len(data['messages'])} messages")
-                        return True
-                    else:
-                        self.log_test("Chat History", False, f"Expected at least 2 messages, got {len(data['messages'])}")
-                        return False
-                else:
-                    self.log_test("Chat History", False, f"Invalid response structure: {data}")
-                    return False
-            else:
-                self.log_test("Chat History", False, f"Status code: {response.status_code}")
-                return False
-        except Exception as e:
-            self.log_test("Chat History", False, f"Exception: {str(e)}")
-            return False
+        
+        def validate(data):
+            if "session_id" not in data or "messages" not in data:
+                return False, f"Invalid response structure: {data}"
+            if len(data["messages"]) >= 2:  # Should have user + assistant messages
+                return True, f"Found {len(data['messages'])} messages"
+            return False, f"Expected at least 2 messages, got {len(data['messages'])}"
+        
+        # The backend saves messages after sending the answer, so the last exchange can take a moment to show up
+        return self._do_request(
+            "Chat History", "GET", self._url_history_prefix + self.session_id, validate, attempts=self._HISTORY_ATTEMPTS
+        )
 
     def test_normal_flow_data_available(self):
         """Test normal flow with data available - should return live data without fallback disclaimer"""
-        try:
-            payload = {
-                "question": "What are potato prices in Bihar?",
-                "session_id": f"test-normal-{uuid.uuid4()}",
-                "language": "en"
-            }
+        def validate(data):
+            answer = data.get("answer", "")
+            sources = data.get("sources", [])
             
-            response = requests.post(
-                f"{self.api_url}/chat/query",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=60
-            )
+            # Should NOT contain fallback disclaimer
+            has_disclaimer = _EN_DISCLAIMER in answer
+            has_sources = len(sources) > 0
             
-            if response.status_code == 200:
-                data = response.json()
-                answer = data.get("answer", "")
-                sources = data.get("sources", [])
-                
-                # Should NOT contain fallback disclaimer
-                has_disclaimer = "⚠️ Note: Live data from data.gov.in is currently unavailable" in answer
-                has_sources = len(sources) > 0
-                
-                if not has_disclaimer and has_sources and len(answer) > 50:
-                    self.log_test("Normal Flow (Data Available)", True, f"Answer length: {len(answer)}, Sources: {len(sources)}, No disclaimer: {not has_disclaimer}")
-                    return True
-                else:
-                    self.log_test("Normal Flow (Data Available)", False, f"Has disclaimer: {has_disclaimer}, Sources: {len(sources)}, Answer length: {len(answer)}")
-                    return False
-            else:
-                self.log_test("Normal Flow (Data Available)", False, f"Status code: {response.status_code}")
-                return False
-        except Exception as e:
-            self.log_test("Normal Flow (Data Available)", False, f"Exception: {str(e)}")
-            return False
+            if not has_disclaimer and has_sources and len(answer) > 50:
+                return True, f"Answer length: {len(answer)}, Sources: {len(sources)}, No disclaimer: {not has_disclaimer}"
+            return False, f"Has disclaimer: {has_disclaimer}, Sources: {len(sources)}, Answer length: {len(answer)}"
+        
+        return self._chat_query(
+            "Normal Flow (Data Available)", "What are potato prices in Bihar?", self._session_id("normal"), "en", validate
+        )
+
+    def _validate_english_fallback(self, data):
+        """Fallback answers carry the English disclaimer and no sources"""
+        answer = data.get("answer", "")
+        sources = data.get("sources", [])
+        
+        # Should contain fallback disclaimer and empty sources
+        has_disclaimer = _EN_DISCLAIMER in answer
+        sources_empty = len(sources) == 0
+        
+        if has_disclaimer and sources_empty and len(answer) > 100:
+            return True, f"Has disclaimer: {has_disclaimer}, Empty sources: {sources_empty}, Answer length: {len(answer)}"
+        return False, f"Has disclaimer: {has_disclaimer}, Sources: {len(sources)}, Answer length: {len(answer)}"
 
     def test_fallback_outside_domain(self):
         """Test fallback for query outside domain - should trigger AI fallback with disclaimer"""
-        try:
-            payload = {
-                "question": "What is the weather forecast for tomorrow?",
-                "session_id": f"test-fallback-{uuid.uuid4()}",
-                "language": "en"
-            }
-            
-            response = requests.post(
-                f"{self.api_url}/chat/query",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                answer = data.get("answer", "")
-                sources = data.get("sources", [])
-                
-                # Should contain fallback disclaimer and empty sources
-                has_disclaimer = "⚠️ Note: Live data from data.gov.in is currently unavailable" in answer
-                sources_empty = len(sources) == 0
-                
-                if has_disclaimer and sources_empty and len(answer) > 100:
-                    self.log_test("Fallback (Outside Domain)", True, f"Has disclaimer: {has_disclaimer}, Empty sources: {sources_empty}, Answer length: {len(answer)}")
-                    return True
-                else:
-                    self.log_test("Fallback (Outside Domain)", False, f"Has disclaimer: {has_disclaimer}, Sources: {len(sources)}, Answer length: {len(answer)}")
-                    return False
-            else:
-                self.log_test("Fallback (Outside Domain)", False, f"Status code: {response.status_code}")
-                return False
-        except Exception as e:
-            self.log_test("Fallback (Outside Domain)", False, f"Exception: {str(e)}")
-            return False
+        return self._chat_query(
+            "Fallback (Outside Domain)", "What is the weather forecast for tomorrow?",
+            self._session_id("fallback"), "en", self._validate_english_fallback
+        )
 
     def test_fallback_obscure_query(self):
         """Test fallback for obscure query - should trigger fallback with disclaimer"""
-        try:
-            payload = {
-                "question": "Tell me about quantum physics",
-                "session_id": f"test-obscure-{uuid.uuid4()}",
-                "language": "en"
-            }
-            
-            response = requests.post(
-                f"{self.api_url}/chat/query",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                answer = data.get("answer", "")
-                sources = data.get("sources", [])
-                
-                # Should contain fallback disclaimer and empty sources
-                has_disclaimer = "⚠️ Note: Live data from data.gov.in is currently unavailable" in answer
-                sources_empty = len(sources) == 0
-                
-                if has_disclaimer and sources_empty and len(answer) > 100:
-                    self.log_test("Fallback (Obscure Query)", True, f"Has disclaimer: {has_disclaimer}, Empty sources: {sources_empty}, Answer length: {len(answer)}")
-                    return True
-                else:
-                    self.log_test("Fallback (Obscure Query)", False, f"Has disclaimer: {has_disclaimer}, Sources: {len(sources)}, Answer length: {len(answer)}")
-                    return False
-            else:
-                self.log_test("Fallback (Obscure Query)", False, f"Status code: {response.status_code}")
-                return False
-        except Exception as e:
-            self.log_test("Fallback (Obscure Query)", False, f"Exception: {str(e)}")
-            return False
+        return self._chat_query(
+            "Fallback (Obscure Query)", "Tell me about quantum physics",
+            self._session_id("obscure"), "en", self._validate_english_fallback
+        )
 
     def test_bilingual_fallback(self):
         """Test bilingual fallback in Hindi - should trigger fallback with Hindi disclaimer"""
-        try:
-            payload = {
-                "question": "मौसम की जानकारी दें",  # Give weather information
-                "session_id": f"test-hindi-fallback-{uuid.uuid4()}",
-                "language": "hi"
-            }
+        def validate(data):
+            answer = data.get("answer", "")
+            sources = data.get("sources", [])
             
-            response = requests.post(
-                f"{self.api_url}/chat/query",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=60
-            )
+            # Should contain Hindi fallback disclaimer and empty sources
+            has_hindi_disclaimer = _HI_DISCLAIMER in answer
+            sources_empty = len(sources) == 0
+            has_hindi = bool(HINDI_RE.search(answer))
             
-            if response.status_code == 200:
-                data = response.json()
-                answer = data.get("answer", "")
-                sources = data.get("sources", [])
-                
-                # Should contain Hindi fallback disclaimer and empty sources
-                has_hindi_disclaimer = "⚠️ नोट: data.gov.in से लाइव डेटा वर्तमान में उपलब्ध नहीं है" in answer
-                sources_empty = len(sources) == 0
-                has_hindi = any('\u0900' <= char <= '\u097F' for char in answer)
-                
-                if has_hindi_disclaimer and sources_empty and has_hindi and len(answer) > 100:
-                    self.log_test("Bilingual Fallback (Hindi)", True, f"Has Hindi disclaimer: {has_hindi_disclaimer}, Empty sources: {sources_empty}, Has Hindi: {has_hindi}, Answer length: {len(answer)}")
-                    return True
-                else:
-                    self.log_test("Bilingual Fallback (Hindi)", False, f"Has Hindi disclaimer: {has_hindi_disclaimer}, Sources: {len(sources)}, Has Hindi: {has_hindi}, Answer length: {len(answer)}")
-                    return False
-            else:
-                self.log_test("Bilingual Fallback (Hindi)", False, f"Status code: {response.status_code}")
-                return False
-        except Exception as e:
-            self.log_test("Bilingual Fallback (Hindi)", False, f"Exception: {str(e)}")
-            return False
+            if has_hindi_disclaimer and sources_empty and has_hindi and len(answer) > 100:
+                return True, f"Has Hindi disclaimer: {has_hindi_disclaimer}, Empty sources: {sources_empty}, Has Hindi: {has_hindi}, Answer length: {len(answer)}"
+            return False, f"Has Hindi disclaimer: {has_hindi_disclaimer}, Sources: {len(sources)}, Has Hindi: {has_hindi}, Answer length: {len(answer)}"
+        
+        return self._chat_query(
+            "Bilingual Fallback (Hindi)", "मौसम की जानकारी दें",  # Give weather information
+            self._session_id("hindi-fallback"), "hi", validate
+        )
 
     def test_session_continuity(self):
         """Test session continuity - mix normal queries and fallback queries in same session"""
         try:
-            session_id = f"test-continuity-{uuid.uuid4()}"
+            session_id = self._session_id("continuity")
             
             # First query - normal (should have data)
-            payload1 = {
-                "question": "Show me potato prices",
-                "session_id": session_id,
-                "language": "en"
-            }
-            
-            response1 = requests.post(
-                f"{self.api_url}/chat/query",
-                json=payload1,
-                headers={"Content-Type": "application/json"},
-                timeout=60
+            response1 = self.client.post(
+                self._url_chat,
+                content=_chat_body("Show me potato prices", session_id, "en"),
+                timeout=self._CHAT_TIMEOUT
             )
             
             # Second query - fallback (should trigger fallback)
-            payload2 = {
-                "question": "What is artificial intelligence?",
-                "session_id": session_id,
-                "language": "en"
-            }
-            
-            response2 = requests.post(
-                f"{self.api_url}/chat/query",
-                json=payload2,
-                headers={"Content-Type": "application/json"},
-                timeout=60
+            response2 = self.client.post(
+                self._url_chat,
+                content=_chat_body("What is artificial intelligence?", session_id, "en"),
+                timeout=self._CHAT_TIMEOUT
             )
             
             if response1.status_code == 200 and response2.status_code == 200:
-                data1 = response1.json()
-                data2 = response2.json()
+                data1 = _json_loads(response1.content)
+                data2 = _json_loads(response2.content)
                 
                 # Verify session IDs match
                 same_session = data1.get("session_id") == data2.get("session_id") == session_id
@@ -387,7 +386,7 @@ class AgriClimateAPITester:
                 second_no_sources = len(data2.get("sources", [])) == 0
                 
                 # Second should have disclaimer
-                second_has_disclaimer = "⚠️ Note: Live data from data.gov.in is currently unavailable" in data2.get("answer", "")
+                second_has_disclaimer = _EN_DISCLAIMER in data2.get("answer", "")
                 
                 if same_session and first_has_sources and second_no_sources and second_has_disclaimer:
                     self.log_test("Session Continuity", True, f"Same session: {same_session}, First has sources: {first_has_sources}, Second fallback: {second_has_disclaimer}")
@@ -404,22 +403,23 @@ class AgriClimateAPITester:
 
     def test_error_handling(self):
         """Test error handling with invalid requests"""
+        if self._reuse_verdicts:
+            status_code = self._cache.recall(_ERROR_CHECK_KEY)
+            if status_code is not None:
+                self.log_test("Error Handling (Empty Question)", True, f"Status: {status_code} (cached)")
+                return True
+        
         try:
             # Test with empty question
-            payload = {
-                "question": "",
-                "language": "en"
-            }
-            
-            response = requests.post(
-                f"{self.api_url}/chat/query",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=30
+            response = self.client.post(
+                self._url_chat,
+                content=_EMPTY_QUESTION_BODY,
+                timeout=self._CHAT_TIMEOUT
             )
             
             # Should handle gracefully (either 400 or 200 with error message)
             if response.status_code in [200, 400, 422]:
+                self._cache.remember(_ERROR_CHECK_KEY, response.status_code, _ERROR_CHECK_TTL)
                 self.log_test("Error Handling (Empty Question)", True, f"Status: {response.status_code}")
                 return True
             else:
@@ -429,46 +429,91 @@ class AgriClimateAPITester:
             self.log_test("Error Handling (Empty Question)", False, f"Exception: {str(e)}")
             return False
 
+    def _backend_reachable(self):
+        """Probe /api/health once, without retries, so an unreachable backend fails fast instead of per test"""
+        try:
+            httpx.get(self._url_health, timeout=self._PREFLIGHT_TIMEOUT)
+            return True
+        except httpx.TransportError as e:
+            print(f"❌ Backend unreachable: {str(e)}", file=self._out)
+            return False
+
+    def _skip_tests(self, tests, reason):
+        for test in tests:
+            self.test_results.append(ResultRow(test.__name__, "SKIPPED", reason))
+        print(f"⏭️  Skipped {len(tests)} tests ({reason})", file=self._out)
+
+    def _run_concurrently(self, *tests):
+        """Run independent tests on worker threads sharing the HTTP/2 client; returns once all have finished"""
+        with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+            for future in as_completed([executor.submit(test) for test in tests]):
+                future.result()
+
     def run_all_tests(self):
         """Run all backend tests"""
-        print("🚀 Starting AgriClimate Q&A System Backend Tests")
-        print(f"🌐 Testing against: {self.base_url}")
-        print("=" * 60)
+        try:
+            return self._run_all_tests()
+        finally:
+            if self._out is not sys.stdout:
+                sys.stdout.write(self._out.getvalue())
+                sys.stdout.flush()
+
+    def _run_all_tests(self):
+        print("🚀 Starting AgriClimate Q&A System Backend Tests", file=self._out)
+        print(f"🌐 Testing against: {self.base_url}", file=self._out)
+        print("=" * 60, file=self._out)
+        
+        if not self._backend_reachable():
+            self._skip_tests([
+                self.test_health_endpoint, self.test_root_endpoint, self.test_datasets_endpoint,
+                self.test_error_handling, self.test_chat_query_english, self.test_chat_query_hindi,
+                self.test_chat_history, self.test_normal_flow_data_available, self.test_fallback_outside_domain,
+                self.test_fallback_obscure_query, self.test_bilingual_fallback, self.test_session_continuity,
+            ], "backend down")
+            self.client.close()
+            return 1
         
-        # Basic connectivity tests
-        self.test_health_endpoint()
-        self.test_root_endpoint()
-        self.test_datasets_endpoint()
+        # Basic connectivity and error handling tests have no ordering dependency, so run them concurrently
+        self._run_concurrently(
+            self.test_health_endpoint,
+            self.test_root_endpoint,
+            self.test_datasets_endpoint,
+            self.test_error_handling,
+        )
         
-        # Core functionality tests
-        self.test_chat_query_english()
-        self.test_chat_query_hindi()
+        # Core functionality tests: both queries use the preset session, history needs both to have finished
+        self._run_concurrently(self.test_chat_query_english, self.test_chat_query_hindi)
         self.test_chat_history()
         
         # AI Fallback Feature Tests (NEW)
-        print("\n🤖 Testing AI Fallback Feature:")
-        self.test_normal_flow_data_available()
-        self.test_fallback_outside_domain()
-        self.test_fallback_obscure_query()
-        self.test_bilingual_fallback()
-        self.test_session_continuity()
+        print("\n🤖 Testing AI Fallback Feature:", file=self._out)
+        # Each of these tests uses its own session, so they go out as one batch of multiplexed HTTP/2 streams.
+        # Session continuity keeps its two queries sequential inside its own thread: the server only stores the first
+        # exchange after answering it, and the second query is meant to see that history
+        self._run_concurrently(
+            self.test_normal_flow_data_available,
+            self.test_fallback_outside_domain,
+            self.test_fallback_obscure_query,
+            self.test_bilingual_fallback,
+            self.test_session_continuity,
+        )
         
-        # Error handling tests
-        self.test_error_handling()
+        self.client.close()
         
         # Print summary
-        print("\n" + "=" * 60)
-        print(f"📊 Test Summary: {self.tests_passed}/{self.tests_run} tests passed")
+        print("\n" + "=" * 60, file=self._out)
+        print(f"📊 Test Summary: {self.tests_passed}/{self.tests_run} tests passed", file=self._out)
         
         if self.tests_passed == self.tests_run:
-            print("🎉 All tests passed!")
+            print("🎉 All tests passed!", file=self._out)
             return 0
         else:
-            print("⚠️  Some tests failed. Check details above.")
+            print("⚠️  Some tests failed. Check details above.", file=self._out)
             return 1
 
 def main():
-    tester = AgriClimateAPITester()
+    args = sys.argv[1:]
+    tester = AgriClimateAPITester(live="--live" in args, force="--force" in args)
     return tester.run_all_tests()
 
 if __name__ == "__main__":
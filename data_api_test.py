@@ -2,8 +2,19 @@
 """
 Test data.gov.in API integration independently of LLM
 """
+import atexit
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Pooled session for data.gov.in calls; transient gateway errors are retried on the same connection
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+))
+atexit.register(_SESSION.close)
 
 def test_data_gov_api():
     """Test if data.gov.in API is working"""
@@ -21,7 +32,7 @@ def test_data_gov_api():
     }
     
     try:
-        response = requests.get(url, params=params, timeout=30)
+        response = _SESSION.get(url, params=params, timeout=(5, 30))  # (connect, read)
         print(f"📡 API Response Status: {response.status_code}")
         
         if response.status_code == 200:
@@ -70,11 +81,16 @@ def test_dataset_search():
         
         data_service = DataService()
         
-        for query in test_queries:
+        # Run every search on one event loop instead of creating a loop per query
+        import asyncio
+        
+        async def run_all():
+            return await asyncio.gather(*(data_service.search_datasets(query) for query in test_queries))
+        
+        results = asyncio.run(run_all())
+        
+        for query, datasets in zip(test_queries, results):
             print(f"\n📝 Testing query: '{query}'")
-            # Use asyncio to run the async function
-            import asyncio
-            datasets = asyncio.run(data_service.search_datasets(query))
             print(f"   Found {len(datasets)} relevant datasets")
             
             for dataset in datasets:
@@ -1,12 +1,11 @@
-import requests
-import json
 import uuid
-from datetime import datetime
+from api_test_utils import CHAT_REQUIRED, json_session
 
 class DetailedAgriClimateAPITester:
     def __init__(self, base_url="https://fetch-fallback-ai.preview.emergentagent.com"):
         self.base_url = base_url
         self.api_url = f"{base_url}/api"
+        self.session = json_session()
         self.session_id = f"test-session-{uuid.uuid4()}"
         self.tests_run = 0
         self.tests_passed = 0
@@ -41,10 +40,9 @@ class DetailedAgriClimateAPITester:
                     "language": language
                 }
                 
-                response = requests.post(
+                response = self.session.post(
                     f"{self.api_url}/chat/query",
                     json=payload,
-                    headers={"Content-Type": "application/json"},
                     timeout=60
                 )
                 
@@ -52,8 +50,8 @@ class DetailedAgriClimateAPITester:
                     data = response.json()
                     
                     # Check response structure
-                    required_fields = ["session_id", "answer", "sources", "timestamp"]
-                    if all(field in data for field in required_fields):
+                    missing = CHAT_REQUIRED - data.keys()
+                    if not missing:
                         
                         # Check if answer is meaningful (not error message)
                         answer = data["answer"]
@@ -79,9 +77,8 @@ class DetailedAgriClimateAPITester:
                             self.log_test(f"Query: '{question}' ({language})", False, 
                                         f"Error in response or too short: {answer[:100]}...")
                     else:
-                        missing = [f for f in required_fields if f not in data]
                         self.log_test(f"Query: '{question}' ({language})", False, 
-                                    f"Missing fields: {missing}")
+                                    f"Missing fields: {sorted(missing)}")
                 else:
                     self.log_test(f"Query: '{question}' ({language})", False, 
                                 f"Status code: {response.status_code}, Response: {response.text[:200]}")
@@ -98,10 +95,9 @@ class DetailedAgriClimateAPITester:
                 "language": "en"
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=60
             )
             
@@ -150,16 +146,15 @@ class DetailedAgriClimateAPITester:
                 "language": "en"
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=60
             )
             
             if response.status_code == 200:
                 # Now check history
-                history_response = requests.get(f"{self.api_url}/chat/history/{self.session_id}", timeout=10)
+                history_response = self.session.get(f"{self.api_url}/chat/history/{self.session_id}", timeout=10)
                 
                 if history_response.status_code == 200:
                     history_data = history_response.json()
@@ -200,6 +195,8 @@ class DetailedAgriClimateAPITester:
         # Test session management
         self.test_session_management()
         
+        self.session.close()
+        
         # Print summary
         print("\n" + "=" * 70)
         print(f"📊 Detailed Test Summary: {self.tests_passed}/{self.tests_run} tests passed")
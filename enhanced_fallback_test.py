@@ -1,14 +1,13 @@
-import requests
 import sys
-import json
-from datetime import datetime
 import uuid
 import time
+from api_test_utils import HINDI_RE, SOURCE_FIELDS, ResultRow, json_session
 
 class EnhancedFallbackTester:
     def __init__(self, base_url="https://fetch-fallback-ai.preview.emergentagent.com"):
         self.base_url = base_url
         self.api_url = f"{base_url}/api"
+        self.session = json_session()
         self.tests_run = 0
         self.tests_passed = 0
         self.test_results = []
@@ -22,11 +21,7 @@ class EnhancedFallbackTester:
         else:
             print(f"❌ {name} - FAILED: {details}")
         
-        self.test_results.append({
-            "test": name,
-            "status": "PASSED" if success else "FAILED",
-            "details": details
-        })
+        self.test_results.append(ResultRow(name, "PASSED" if success else "FAILED", details))
 
     def test_retry_mechanism(self):
         """Test Option 6: Retry Mechanism with exponential backoff"""
@@ -39,10 +34,9 @@ class EnhancedFallbackTester:
             }
             
             start_time = time.time()
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=90
             )
             end_time = time.time()
@@ -81,10 +75,9 @@ class EnhancedFallbackTester:
                 "language": "en"
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=90
             )
             
@@ -136,10 +129,9 @@ class EnhancedFallbackTester:
                 "language": "hi"
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=90
             )
             
@@ -150,7 +142,7 @@ class EnhancedFallbackTester:
                 
                 # Check for Hindi hybrid disclaimer
                 has_hindi_hybrid_disclaimer = "ℹ️ हाइब्रिड प्रतिक्रिया" in answer
-                has_hindi_content = any('\u0900' <= char <= '\u097F' for char in answer)
+                has_hindi_content = HINDI_RE.search(answer) is not None
                 
                 if (has_hindi_hybrid_disclaimer or len(sources) > 0) and has_hindi_content and len(answer) > 50:
                     self.log_test("Hybrid Mode (Hindi)", True, 
@@ -179,10 +171,9 @@ class EnhancedFallbackTester:
                 "language": "en"
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=90
             )
             
@@ -235,10 +226,9 @@ class EnhancedFallbackTester:
                 "language": "hi"
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=90
             )
             
@@ -249,7 +239,7 @@ class EnhancedFallbackTester:
                 
                 # Should have Hindi fallback disclaimer
                 has_hindi_disclaimer = "⚠️ नोट: data.gov.in से लाइव डेटा वर्तमान में उपलब्ध नहीं है" in answer
-                has_hindi_content = any('\u0900' <= char <= '\u097F' for char in answer)
+                has_hindi_content = HINDI_RE.search(answer) is not None
                 is_comprehensive = len(answer) > 300
                 has_trusted_sources = len(sources) > 0
                 
@@ -279,10 +269,9 @@ class EnhancedFallbackTester:
                 "language": "en"
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=90
             )
             
@@ -298,12 +287,7 @@ class EnhancedFallbackTester:
                 has_sources = len(sources) > 0
                 
                 # Verify sources have required fields
-                valid_sources = True
-                if sources:
-                    for source in sources:
-                        if not all(field in source for field in ['title', 'url', 'description']):
-                            valid_sources = False
-                            break
+                valid_sources = all(SOURCE_FIELDS <= source.keys() for source in sources)
                 
                 # Check for relevant trusted sources (climate-related)
                 relevant_sources = False
@@ -339,10 +323,9 @@ class EnhancedFallbackTester:
                 "language": "en"
             }
             
-            response_crop = requests.post(
+            response_crop = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload_crop,
-                headers={"Content-Type": "application/json"},
                 timeout=90
             )
             
@@ -384,10 +367,9 @@ class EnhancedFallbackTester:
                 "language": "en"
             }
             
-            response1 = requests.post(
+            response1 = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload1,
-                headers={"Content-Type": "application/json"},
                 timeout=90
             )
             
@@ -398,10 +380,9 @@ class EnhancedFallbackTester:
                 "language": "en"
             }
             
-            response2 = requests.post(
+            response2 = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload2,
-                headers={"Content-Type": "application/json"},
                 timeout=90
             )
             
@@ -412,10 +393,9 @@ class EnhancedFallbackTester:
                 "language": "hi"
             }
             
-            response3 = requests.post(
+            response3 = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload3,
-                headers={"Content-Type": "application/json"},
                 timeout=90
             )
             
@@ -438,7 +418,7 @@ class EnhancedFallbackTester:
                 
                 # Test 3: Hindi fallback - should have Hindi disclaimer
                 hindi_has_disclaimer = "⚠️ नोट:" in data3.get("answer", "")
-                hindi_has_content = any('\u0900' <= char <= '\u097F' for char in data3.get("answer", ""))
+                hindi_has_content = HINDI_RE.search(data3.get("answer", "")) is not None
                 
                 all_tests_pass = (same_session and normal_has_sources and normal_no_disclaimer and 
                                 fallback_has_disclaimer and fallback_has_sources and 
@@ -488,6 +468,8 @@ class EnhancedFallbackTester:
         print("\n🔧 Testing Integration:")
         self.test_integration_all_features()
         
+        self.session.close()
+        
         # Print summary
         print("\n" + "=" * 80)
         print(f"📊 Enhanced Fallback Test Summary: {self.tests_passed}/{self.tests_run} tests passed")
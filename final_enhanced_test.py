@@ -1,14 +1,13 @@
-import requests
 import sys
-import json
-from datetime import datetime
 import uuid
 import time
+from api_test_utils import HINDI_RE, SOURCE_FIELDS, json_session
 
 class FinalEnhancedFallbackTester:
     def __init__(self, base_url="https://fetch-fallback-ai.preview.emergentagent.com"):
         self.base_url = base_url
         self.api_url = f"{base_url}/api"
+        self.session = json_session()
         self.tests_run = 0
         self.tests_passed = 0
 
@@ -31,10 +30,9 @@ class FinalEnhancedFallbackTester:
             }
             
             start_time = time.time()
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=60
             )
             end_time = time.time()
@@ -70,10 +68,9 @@ class FinalEnhancedFallbackTester:
                 "language": "en"
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=60
             )
             
@@ -111,10 +108,9 @@ class FinalEnhancedFallbackTester:
                 "language": "en"
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=60
             )
             
@@ -130,12 +126,7 @@ class FinalEnhancedFallbackTester:
                 has_trusted_sources = len(sources) > 0
                 
                 # Verify sources have proper structure
-                valid_sources = True
-                if sources:
-                    for source in sources:
-                        if not all(field in source for field in ['title', 'url', 'description']):
-                            valid_sources = False
-                            break
+                valid_sources = all(SOURCE_FIELDS <= source.keys() for source in sources)
                 
                 if has_fallback_disclaimer and has_trusted_sources and valid_sources:
                     self.log_test("Enhanced Responses + Trusted Sources", True, 
@@ -162,10 +153,9 @@ class FinalEnhancedFallbackTester:
                 "language": "en"
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=60
             )
             
@@ -207,10 +197,9 @@ class FinalEnhancedFallbackTester:
                 "language": "hi"
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=60
             )
             
@@ -223,7 +212,7 @@ class FinalEnhancedFallbackTester:
                 has_hindi_disclaimer = "⚠️ नोट: data.gov.in से लाइव डेटा वर्तमान में उपलब्ध नहीं है" in answer
                 
                 # Should have Hindi content
-                has_hindi_content = any('\u0900' <= char <= '\u097F' for char in answer)
+                has_hindi_content = HINDI_RE.search(answer) is not None
                 
                 # Should have trusted sources
                 has_trusted_sources = len(sources) > 0
@@ -255,10 +244,9 @@ class FinalEnhancedFallbackTester:
                 "language": "en"
             }
             
-            response1 = requests.post(
+            response1 = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload1,
-                headers={"Content-Type": "application/json"},
                 timeout=60
             )
             
@@ -269,10 +257,9 @@ class FinalEnhancedFallbackTester:
                 "language": "en"
             }
             
-            response2 = requests.post(
+            response2 = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload2,
-                headers={"Content-Type": "application/json"},
                 timeout=60
             )
             
@@ -327,6 +314,8 @@ class FinalEnhancedFallbackTester:
         print("\n🔧 Testing Integration:")
         self.test_session_continuity_enhanced()
         
+        self.session.close()
+        
         # Print summary
         print("\n" + "=" * 80)
         print(f"📊 Final Test Summary: {self.tests_passed}/{self.tests_run} tests passed")
@@ -1,13 +1,12 @@
-import requests
 import sys
-import json
-from datetime import datetime
 import uuid
+from api_test_utils import HINDI_RE, SOURCE_FIELDS, json_session
 
 class QuotaAwareAPITester:
     def __init__(self, base_url="https://fetch-fallback-ai.preview.emergentagent.com"):
         self.base_url = base_url
         self.api_url = f"{base_url}/api"
+        self.session = json_session()
         self.tests_run = 0
         self.tests_passed = 0
         self.quota_exceeded = False
@@ -24,7 +23,7 @@ class QuotaAwareAPITester:
     def test_basic_connectivity(self):
         """Test basic API connectivity"""
         try:
-            response = requests.get(f"{self.api_url}/health", timeout=10)
+            response = self.session.get(f"{self.api_url}/health", timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 self.log_test("Basic Connectivity", True, f"Health status: {data.get('status')}")
@@ -39,7 +38,7 @@ class QuotaAwareAPITester:
     def test_datasets_endpoint(self):
         """Test datasets endpoint"""
         try:
-            response = requests.get(f"{self.api_url}/datasets", timeout=10)
+            response = self.session.get(f"{self.api_url}/datasets", timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 datasets = data.get("datasets", [])
@@ -61,10 +60,9 @@ class QuotaAwareAPITester:
                 "language": "en"
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=30
             )
             
@@ -101,10 +99,9 @@ class QuotaAwareAPITester:
             }
             
             start_time = time.time()
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=60
             )
             end_time = time.time()
@@ -134,10 +131,9 @@ class QuotaAwareAPITester:
                 "language": "en"
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=60
             )
             
@@ -151,7 +147,7 @@ class QuotaAwareAPITester:
                     if len(sources) > 0:
                         # Check if sources have proper structure
                         first_source = sources[0]
-                        has_required_fields = all(field in first_source for field in ['title', 'url', 'description'])
+                        has_required_fields = SOURCE_FIELDS <= first_source.keys()
                         self.log_test("Trusted Sources Structure", True, 
                                     f"Sources present: {len(sources)}, Proper structure: {has_required_fields}")
                         return True
@@ -183,10 +179,9 @@ class QuotaAwareAPITester:
                 "language": "en"
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=60
             )
             
@@ -225,10 +220,9 @@ class QuotaAwareAPITester:
                 "language": "en"
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=60
             )
             
@@ -270,10 +264,9 @@ class QuotaAwareAPITester:
                 "language": "hi"
             }
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.api_url}/chat/query",
                 json=payload,
-                headers={"Content-Type": "application/json"},
                 timeout=60
             )
             
@@ -290,7 +283,7 @@ class QuotaAwareAPITester:
                     return True
                 else:
                     # Check if it's a quota error but still has some Hindi content
-                    has_hindi_content = any('\u0900' <= char <= '\u097F' for char in answer)
+                    has_hindi_content = HINDI_RE.search(answer) is not None
                     if has_hindi_content or "quota" in answer.lower():
                         self.log_test("Bilingual Support Structure", True, 
                                     f"Bilingual structure present (Hindi content: {has_hindi_content})")
@@ -332,6 +325,8 @@ class QuotaAwareAPITester:
         self.test_enhanced_responses_structure()
         self.test_bilingual_support_structure()
         
+        self.session.close()
+        
         # Print summary
         print("\n" + "=" * 80)
         print(f"📊 Test Summary: {self.tests_passed}/{self.tests_run} tests passed")